@@ -0,0 +1,329 @@
+"""
+頁面互動模組
+Page Actions Module
+此模組在擷取前執行點擊、輸入、按鍵、滾動與等待；連續的頁面內動作合併為單次腳本執行
+"""
+
+import time
+from deadline_handler import Deadline
+from tracing_handler import traced
+
+# 可在頁面內執行的動作（連續出現時合併為一次腳本呼叫）
+IN_PAGE_ACTIONS = ("click", "type", "scroll", "wait_for", "wait", "wait_network_idle")
+
+# 需要真實輸入事件的動作，經 DevTools 送出，會切斷批次
+NATIVE_ACTIONS = ("press",)
+
+DEFAULT_ACTION_TIMEOUT = 5
+DEFAULT_SCRIPT_TIMEOUT = 30
+DEFAULT_IDLE_MS = 500
+
+# 特殊按鍵：(key, code, windowsVirtualKeyCode, text)
+KEY_DEFINITIONS = {
+    "Enter": ("Enter", "Enter", 13, "\r"),
+    "Tab": ("Tab", "Tab", 9, ""),
+    "Escape": ("Escape", "Escape", 27, ""),
+    "Backspace": ("Backspace", "Backspace", 8, ""),
+    "Space": (" ", "Space", 32, " "),
+    "ArrowUp": ("ArrowUp", "ArrowUp", 38, ""),
+    "ArrowDown": ("ArrowDown", "ArrowDown", 40, ""),
+    "ArrowLeft": ("ArrowLeft", "ArrowLeft", 37, ""),
+    "ArrowRight": ("ArrowRight", "ArrowRight", 39, ""),
+    "PageUp": ("PageUp", "PageUp", 33, ""),
+    "PageDown": ("PageDown", "PageDown", 34, ""),
+    "Home": ("Home", "Home", 36, ""),
+    "End": ("End", "End", 35, ""),
+}
+
+# 依序執行一批頁面內動作，回傳每個動作的耗時與錯誤（回傳 Promise，WebDriver 會等待完成）
+ACTIONS_SCRIPT = """
+const actions = arguments[0];
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+function find(selector) {
+    if (selector.startsWith('//')) {
+        return document.evaluate(
+            selector, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null
+        ).singleNodeValue;
+    }
+    return document.querySelector(selector);
+}
+
+async function waitFor(selector, timeoutMs, visible) {
+    const end = Date.now() + timeoutMs;
+    while (true) {
+        const el = find(selector);
+        if (el && (!visible || el.getClientRects().length > 0)) return el;
+        if (Date.now() > end) throw new Error('timeout waiting for ' + selector);
+        await sleep(100);
+    }
+}
+
+async function networkIdle(idleMs, timeoutMs) {
+    // 已完成的資源數在 idleMs 內沒有增加即視為閒置
+    const end = Date.now() + timeoutMs;
+    let count = performance.getEntriesByType('resource').length;
+    let stableSince = Date.now();
+    while (Date.now() - stableSince < idleMs) {
+        if (Date.now() > end) throw new Error('network not idle within ' + timeoutMs + 'ms');
+        await sleep(50);
+        const current = performance.getEntriesByType('resource').length;
+        if (current !== count || document.readyState !== 'complete') {
+            count = current;
+            stableSince = Date.now();
+        }
+    }
+}
+
+function setValue(el, text) {
+    // 使用原生 setter，讓 React 等框架也能收到變更
+    const proto = el instanceof HTMLTextAreaElement
+        ? HTMLTextAreaElement.prototype : HTMLInputElement.prototype;
+    const setter = Object.getOwnPropertyDescriptor(proto, 'value');
+    if (setter && setter.set && (el instanceof HTMLInputElement || el instanceof HTMLTextAreaElement)) {
+        setter.set.call(el, text);
+    } else if (el.isContentEditable) {
+        el.textContent = text;
+    } else {
+        el.value = text;
+    }
+    el.dispatchEvent(new Event('input', {bubbles: true}));
+    el.dispatchEvent(new Event('change', {bubbles: true}));
+}
+
+// 批次迴圈包在 async 函式中回傳 Promise（execute_script 的外層不是 async 函式）
+return (async () => {
+    const results = [];
+    for (const action of actions) {
+        const start = performance.now();
+        const result = {};
+        const timeoutMs = action.timeout_ms;
+        try {
+            switch (action.type) {
+                case 'click': {
+                    const el = await waitFor(action.selector, timeoutMs, true);
+                    el.scrollIntoView({block: 'center'});
+                    el.click();
+                    break;
+                }
+                case 'type': {
+                    const el = await waitFor(action.selector, timeoutMs, true);
+                    el.focus();
+                    setValue(el, (action.clear === false ? (el.value || '') : '') + action.text);
+                    break;
+                }
+                case 'scroll': {
+                    if (action.selector) {
+                        (await waitFor(action.selector, timeoutMs, false)).scrollIntoView({block: 'start'});
+                    } else if (action.to === 'bottom') {
+                        window.scrollTo(0, document.documentElement.scrollHeight);
+                    } else if (action.to === 'top') {
+                        window.scrollTo(0, 0);
+                    } else {
+                        window.scrollBy(0, action.by || window.innerHeight);
+                    }
+                    result.scroll_y = Math.round(window.scrollY);
+                    break;
+                }
+                case 'wait_for':
+                    await waitFor(action.selector, timeoutMs, action.visible !== false);
+                    break;
+                case 'wait':
+                    await sleep(action.ms || 0);
+                    break;
+                case 'wait_network_idle':
+                    await networkIdle(action.idle_ms, timeoutMs);
+                    break;
+                default:
+                    throw new Error('unknown action: ' + action.type);
+            }
+        } catch (e) {
+            result.error = String(e && e.message ? e.message : e);
+        }
+        result.time_ms = Math.round((performance.now() - start) * 100) / 100;
+        results.push(result);
+        if (result.error && !action.optional) break;
+    }
+    return results;
+})();
+"""
+
+# 導航前在舊文件上留下標記，新文件載入後標記消失
+MARK_DOCUMENT_SCRIPT = "window.__actionsPreviousDocument = true;"
+NAVIGATED_SCRIPT = """
+return !window.__actionsPreviousDocument && document.readyState === 'complete';
+"""
+
+# 按鍵前將焦點移到指定元素
+FOCUS_SCRIPT = """
+const el = arguments[0].startsWith('//')
+    ? document.evaluate(arguments[0], document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue
+    : document.querySelector(arguments[0]);
+if (!el) return 'no such element: ' + arguments[0];
+el.focus();
+return null;
+"""
+
+
+class ActionRunner:
+    """頁面互動執行器"""
+
+    def __init__(self, driver, deadline=None):
+        """初始化互動執行器"""
+        self.driver = driver
+        self.deadline = deadline or Deadline()
+
+    @staticmethod
+    def normalize(action):
+        """補齊動作預設值並驗證類型"""
+        action = dict(action)
+        action_type = action.get("type")
+        if action_type not in IN_PAGE_ACTIONS + NATIVE_ACTIONS:
+            raise ValueError(f"不支援的動作: {action_type}")
+        if action_type in ("click", "type", "wait_for") and not action.get("selector"):
+            raise ValueError(f"動作 {action_type} 需要 selector")
+        if action_type == "type":
+            action["text"] = str(action.get("text", ""))
+        if action_type == "press" and not action.get("key"):
+            raise ValueError("動作 press 需要 key")
+        action["timeout_ms"] = int(action.get("timeout", DEFAULT_ACTION_TIMEOUT) * 1000)
+        if action_type == "wait_network_idle":
+            action.setdefault("idle_ms", DEFAULT_IDLE_MS)
+        return action
+
+    @staticmethod
+    def compile(actions):
+        """將連續的頁面內動作分為同一批；原生動作單獨一批，會導航的動作結束所在批次"""
+        batches = []
+        open_batch = False
+        for index, action in enumerate(actions):
+            if action["type"] in NATIVE_ACTIONS:
+                batches.append(("native", [(index, action)]))
+                open_batch = False
+            elif open_batch:
+                batches[-1][1].append((index, action))
+            else:
+                batches.append(("page", [(index, action)]))
+                open_batch = True
+            if action.get("wait_navigation"):
+                open_batch = False
+        return batches
+
+    @staticmethod
+    def _budget(actions):
+        """一批動作最長可能花費的秒數"""
+        return sum(
+            action.get("ms", 0) / 1000
+            if action["type"] == "wait"
+            else action["timeout_ms"] / 1000
+            for action in actions
+        )
+
+    @traced("actions")
+    def run(self, actions):
+        """執行動作列表，回傳每個動作的結果；必要動作失敗時停止並標記其餘為略過"""
+        actions = [self.normalize(action) for action in actions or []]
+        results = [
+            {"index": index, "type": action["type"]}
+            for index, action in enumerate(actions)
+        ]
+        actions_start = time.time()
+        stopped = False
+
+        try:
+            for batch_number, (kind, batch) in enumerate(self.compile(actions)):
+                if stopped:
+                    break
+                if self.deadline.expired():
+                    self.deadline.skip("actions")
+                    break
+
+                last_index, last_action = batch[-1]
+                if last_action.get("wait_navigation"):
+                    self.driver.execute_script(MARK_DOCUMENT_SCRIPT)
+
+                if kind == "native":
+                    batch_results = [self._press(last_action)]
+                else:
+                    batch_results = self._run_page_batch([a for _, a in batch])
+
+                for (index, action), result in zip(batch, batch_results):
+                    results[index].update(result)
+                    results[index]["batch"] = batch_number
+                    if "error" in result and not action.get("optional"):
+                        stopped = True
+
+                if last_action.get("wait_navigation") and not stopped:
+                    navigation_error = self._wait_navigation(last_action)
+                    if navigation_error:
+                        results[last_index]["error"] = navigation_error
+                        stopped = not last_action.get("optional")
+        finally:
+            # 還原預設腳本逾時，避免影響重複使用的瀏覽器
+            self.driver.set_script_timeout(DEFAULT_SCRIPT_TIMEOUT)
+
+        for result in results:
+            if "time_ms" not in result and "error" not in result:
+                result["skipped"] = True
+
+        failed = sum(1 for result in results if "error" in result)
+        print(
+            f"🖱️ 互動動作完成 ({len(actions)} 個, 失敗 {failed}, 耗時: {time.time() - actions_start:.2f}s)"
+        )
+        return results
+
+    def _run_page_batch(self, actions):
+        """以單次腳本執行一批頁面內動作"""
+        budget = self._budget(actions) + 5
+        self.driver.set_script_timeout(self.deadline.clamp(budget, minimum=1))
+        try:
+            return self.driver.execute_script(ACTIONS_SCRIPT, actions) or []
+        except Exception as e:
+            # 腳本中途導航或逾時：標記在第一個動作上，其餘視為略過
+            return [{"error": str(e)[:200]}]
+
+    def _wait_navigation(self, action):
+        """等待動作觸發的導航完成，逾時回傳錯誤訊息"""
+        end = time.time() + self.deadline.clamp(action["timeout_ms"] / 1000, minimum=1)
+        while time.time() < end:
+            try:
+                if self.driver.execute_script(NAVIGATED_SCRIPT):
+                    return None
+            except Exception:
+                # 導航進行中時腳本可能失敗，繼續等待
+                pass
+            time.sleep(0.1)
+        return f"動作後的導航未在 {action['timeout_ms']}ms 內完成"
+
+    def _press(self, action):
+        """以 DevTools 輸入事件送出按鍵（可觸發表單送出等預設行為）"""
+        press_start = time.time()
+        result = {}
+        try:
+            if action.get("selector"):
+                error = self.driver.execute_script(FOCUS_SCRIPT, action["selector"])
+                if error:
+                    raise Exception(error)
+
+            key = action["key"]
+            if key in KEY_DEFINITIONS:
+                key, code, key_code, text = KEY_DEFINITIONS[key]
+            elif len(key) == 1:
+                code, key_code, text = "", ord(key.upper()), key
+            else:
+                raise ValueError(f"不支援的按鍵: {key}")
+
+            event = {"key": key, "code": code, "windowsVirtualKeyCode": key_code}
+            key_down = (
+                dict(event, type="keyDown", text=text)
+                if text
+                else dict(event, type="rawKeyDown")
+            )
+            self.driver.execute_cdp_cmd("Input.dispatchKeyEvent", key_down)
+            self.driver.execute_cdp_cmd(
+                "Input.dispatchKeyEvent", dict(event, type="keyUp")
+            )
+        except Exception as e:
+            result["error"] = str(e)[:200]
+        result["time_ms"] = round((time.time() - press_start) * 1000, 2)
+        return result
@@ -0,0 +1,251 @@
+"""
+瀏覽器管理模組
+Browser Management Module
+此模組依具名啟動設定檔建立 Chrome，並在 Lambda 容器存活期間保留暖瀏覽器重複使用
+"""
+
+import json
+import os
+import time
+from tempfile import mkdtemp
+from urllib.request import urlopen
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from font_handler import ChromeOptionsBuilder
+from network_handler import enable_performance_log
+from tracing_handler import traced
+
+try:
+    import websocket
+except ImportError:
+    websocket = None
+
+CHROME_BINARY = "/opt/chrome/chrome"
+CHROMEDRIVER_PATH = "/opt/chromedriver"
+
+LAUNCH_PROFILES = ("default", "text-fast", "screenshot-hq", "low-memory")
+
+# 各設定檔的額外瀏覽器偏好設定
+PROFILE_PREFS = {
+    "text-fast": {
+        "profile.managed_default_content_settings.images": 2,
+        "profile.default_content_setting_values.notifications": 2,
+    },
+}
+
+# 同時保留的暖瀏覽器數量與單一瀏覽器最多服務的請求數
+POOL_SIZE = int(os.environ.get("BROWSER_POOL_SIZE", "2"))
+MAX_USES = int(os.environ.get("BROWSER_MAX_USES", "50"))
+
+BASE_DEBUGGING_PORT = 9222
+
+
+class DevToolsSocket:
+    """直接連線到瀏覽器除錯埠的 DevTools 連線（可接收事件，execute_cdp_cmd 無法做到）"""
+
+    def __init__(self, ws_url, timeout=10):
+        """建立連線"""
+        if websocket is None:
+            raise RuntimeError("缺少 websocket-client，無法連線 DevTools")
+        # 不送出 Origin 標頭，避免被 --remote-allow-origins 拒絕
+        self.ws = websocket.create_connection(
+            ws_url, timeout=timeout, suppress_origin=True
+        )
+        self.next_id = 0
+
+    @classmethod
+    def browser(cls, port, timeout=10):
+        """連線到瀏覽器層級的目標"""
+        with urlopen(f"http://127.0.0.1:{port}/json/version", timeout=timeout) as f:
+            ws_url = json.loads(f.read())["webSocketDebuggerUrl"]
+        return cls(ws_url, timeout)
+
+    @classmethod
+    def page(cls, port, target_id, timeout=10):
+        """連線到指定分頁（與 Selenium 的連線各自獨立）"""
+        return cls(f"ws://127.0.0.1:{port}/devtools/page/{target_id}", timeout)
+
+    def send(self, method, params=None):
+        """送出命令，回傳命令編號"""
+        self.next_id += 1
+        self.ws.send(
+            json.dumps({"id": self.next_id, "method": method, "params": params or {}})
+        )
+        return self.next_id
+
+    def receive(self):
+        """讀取下一則訊息"""
+        return json.loads(self.ws.recv())
+
+    def wait(self, predicate):
+        """讀取訊息直到符合條件"""
+        while True:
+            message = self.receive()
+            if predicate(message):
+                if "error" in message:
+                    raise RuntimeError(message["error"].get("message"))
+                return message
+
+    def call(self, method, params=None):
+        """送出命令並等待回應"""
+        command_id = self.send(method, params)
+        return self.wait(lambda m: m.get("id") == command_id).get("result", {})
+
+    def close(self):
+        """關閉連線"""
+        try:
+            self.ws.close()
+        except Exception:
+            pass
+
+
+class BrowserSession:
+    """一個已啟動的瀏覽器與其使用紀錄"""
+
+    def __init__(self, driver, key, profile, launch_time, port):
+        """初始化瀏覽器紀錄"""
+        self.driver = driver
+        self.key = key
+        self.profile = profile
+        self.launch_time = launch_time
+        self.port = port
+        self.uses = 0
+        self.reused = False
+        self.last_used = time.time()
+
+    def info(self):
+        """回傳給呼叫端的瀏覽器資訊"""
+        return {
+            "profile": self.profile,
+            "reused": self.reused,
+            "uses": self.uses,
+            "launch_time": round(self.launch_time, 3),
+        }
+
+
+class BrowserPool:
+    """暖瀏覽器池：依設定檔與啟動參數分組重複使用"""
+
+    def __init__(self, size=POOL_SIZE, max_uses=MAX_USES):
+        """初始化瀏覽器池"""
+        self.size = size
+        self.max_uses = max_uses
+        self.idle = {}
+        self.next_port = BASE_DEBUGGING_PORT
+
+    @staticmethod
+    def make_key(profile, headers=None, trace_network=False):
+        """影響啟動參數的設定組成分組鍵"""
+        header_items = tuple(sorted((headers or {}).items()))
+        return (profile, header_items, bool(trace_network))
+
+    def has_warm(self, profile, headers=None, trace_network=False):
+        """是否有可直接使用的暖瀏覽器（沒有時 acquire 需要啟動 Chrome）"""
+        return self.make_key(profile, headers, trace_network) in self.idle
+
+    def build_options(self, profile, viewport, headers=None, trace_network=False):
+        """依設定檔建立 Chrome 選項"""
+        options = webdriver.ChromeOptions()
+        options.binary_location = CHROME_BINARY
+        for argument in ChromeOptionsBuilder.get_profile_options(profile):
+            options.add_argument(argument)
+        options.add_argument(f"--window-size={viewport['width']}x{viewport['height']}")
+
+        # Create temporary directories
+        options.add_argument(f"--user-data-dir={mkdtemp()}")
+        options.add_argument(f"--data-path={mkdtemp()}")
+        options.add_argument(f"--disk-cache-dir={mkdtemp()}")
+
+        # 每個瀏覽器使用不同的除錯埠，避免池中多個瀏覽器衝突
+        port = self.next_port
+        self.next_port = (
+            BASE_DEBUGGING_PORT + (self.next_port - BASE_DEBUGGING_PORT + 1) % 100
+        )
+        options.add_argument(f"--remote-debugging-port={port}")
+
+        # Add custom headers if provided
+        for key, value in (headers or {}).items():
+            options.add_argument(f"--header={key}: {value}")
+
+        if PROFILE_PREFS.get(profile):
+            options.add_experimental_option("prefs", PROFILE_PREFS[profile])
+
+        # Network events are only logged when tracing is requested
+        if trace_network:
+            enable_performance_log(options)
+        return options, port
+
+    def acquire(
+        self,
+        profile="default",
+        viewport=None,
+        headers=None,
+        trace_network=False,
+        reuse=True,
+    ):
+        """取得瀏覽器：有可用的暖瀏覽器時直接使用，否則啟動新的"""
+        if profile not in LAUNCH_PROFILES:
+            raise ValueError(f"未知的啟動設定檔: {profile}（可用: {', '.join(LAUNCH_PROFILES)}）")
+        viewport = viewport or {"width": 1600, "height": 900}
+        key = self.make_key(profile, headers, trace_network)
+
+        session = self.idle.pop(key, None) if reuse else None
+        if session and self._is_alive(session):
+            session.reused = True
+            print(f"♨️ 重複使用暖瀏覽器 ({profile}, 第 {session.uses + 1} 次)")
+        else:
+            if session:
+                self._quit(session)
+            session = self._launch(key, profile, viewport, headers, trace_network)
+
+        session.uses += 1
+        session.last_used = time.time()
+        return session
+
+    def release(self, session, reuse=True, isolated=False):
+        """歸還瀏覽器：保留供下一次呼叫使用，失敗或超過使用次數時關閉（預設環境可能在多個來源留下資料，未使用無痕環境時一律關閉）"""
+        if not reuse or not isolated or session.uses >= self.max_uses or self.size <= 0:
+            self._quit(session)
+            return
+
+        previous = self.idle.pop(session.key, None)
+        if previous:
+            self._quit(previous)
+        self.idle[session.key] = session
+
+        # 超過池容量時關閉最久未使用的瀏覽器
+        while len(self.idle) > self.size:
+            oldest_key = min(self.idle, key=lambda k: self.idle[k].last_used)
+            self._quit(self.idle.pop(oldest_key))
+
+    @traced("browser.launch")
+    def _launch(self, key, profile, viewport, headers, trace_network):
+        """啟動新的瀏覽器"""
+        options, port = self.build_options(profile, viewport, headers, trace_network)
+        launch_start = time.time()
+        service = Service(CHROMEDRIVER_PATH)
+        driver = webdriver.Chrome(service=service, options=options)
+        launch_time = time.time() - launch_start
+        print(f"🚀 Chrome 啟動完成 ({profile}, {launch_time:.2f}s)")
+        return BrowserSession(driver, key, profile, launch_time, port)
+
+    @staticmethod
+    def _is_alive(session):
+        """檢查瀏覽器是否仍可使用"""
+        try:
+            session.driver.execute_script("return 1;")
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _quit(session):
+        """關閉瀏覽器"""
+        try:
+            session.driver.quit()
+        except Exception as e:
+            print(f"⚠️ 關閉瀏覽器失敗: {e}")
+
+
+# 模組層級的瀏覽器池，在同一個 Lambda 容器的多次呼叫之間保留
+browser_pool = BrowserPool()
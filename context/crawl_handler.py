@@ -0,0 +1,471 @@
+"""
+網站爬取模組
+Site Crawl Module
+此模組以單一暖瀏覽器（可開多個分頁）爬取同網站頁面，連結於頁面內與內容一併擷取，結果逐頁寫入成品輸出
+"""
+
+import json
+import re
+import time
+import uuid
+from collections import deque
+from urllib.error import HTTPError
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+from urllib.request import Request, urlopen
+from urllib.robotparser import RobotFileParser
+from selenium.common.exceptions import TimeoutException
+from deadline_handler import Deadline, PHASE_MIN_SECONDS
+from extraction_handler import ContentExtractor
+from storage_handler import create_artifact_sink, create_store
+from tracing_handler import traced
+
+DEFAULT_MAX_DEPTH = 2
+DEFAULT_MAX_PAGES = 20
+DEFAULT_DELAY = 1.0
+DEFAULT_PAGE_TIMEOUT = 15
+MAX_TABS = 4
+ROBOTS_TTL = 3600
+
+# 正規化時移除的追蹤參數
+TRACKING_PARAMS = ("gclid", "fbclid", "msclkid", "mc_cid", "mc_eid")
+TRACKING_PREFIXES = ("utm_",)
+
+# 不會是 HTML 頁面的副檔名，不放入待爬佇列
+SKIPPED_EXTENSIONS = (
+    ".pdf",
+    ".zip",
+    ".gz",
+    ".jpg",
+    ".jpeg",
+    ".png",
+    ".gif",
+    ".webp",
+    ".svg",
+    ".ico",
+    ".mp3",
+    ".mp4",
+    ".webm",
+    ".css",
+    ".js",
+    ".json",
+    ".xml",
+)
+
+# 在目前分頁開始導航但不等待載入：導航延後到腳本返回之後，ChromeDriver 不會阻塞在這個分頁
+# （舊文件上的標記在新文件出現後消失）
+START_NAVIGATION_SCRIPT = """
+const url = arguments[0];
+window.__crawlPending = true;
+setTimeout(() => { window.location.href = url; }, 0);
+"""
+
+# 讀取分頁載入狀態、最終網址與主文件 HTTP 狀態碼
+TAB_STATE_SCRIPT = """
+if (window.__crawlPending) return {ready: false, pending: true};
+const nav = performance.getEntriesByType('navigation')[0];
+return {
+    ready: document.readyState === 'complete',
+    pending: false,
+    url: location.href,
+    title: document.title,
+    status: nav && nav.responseStatus ? nav.responseStatus : null,
+    error: location.protocol === 'chrome-error:'
+};
+"""
+
+
+def normalize_url(url, base=None):
+    """正規化網址作為去重鍵：小寫主機、移除預設埠、片段與追蹤參數，排序查詢參數"""
+    if base:
+        url = urljoin(base, url)
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except ValueError:
+        return None
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower().rstrip(".")
+    if scheme not in ("http", "https") or not host:
+        return None
+
+    netloc = host
+    if port and (scheme, port) not in (("http", 80), ("https", 443)):
+        netloc = f"{host}:{port}"
+    path = re.sub(r"/{2,}", "/", parts.path or "/")
+    query = urlencode(
+        sorted(
+            (key, value)
+            for key, value in parse_qsl(parts.query, keep_blank_values=True)
+            if key.lower() not in TRACKING_PARAMS
+            and not key.lower().startswith(TRACKING_PREFIXES)
+        )
+    )
+    return urlunsplit((scheme, netloc, path, query, ""))
+
+
+def site_of(url):
+    """取得網址所屬網站（去掉 www. 的主機名稱）"""
+    host = (urlsplit(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+class CrawlFrontier:
+    """待爬佇列：廣度優先、依正規化網址去重，並套用範圍與包含/排除規則"""
+
+    def __init__(self, seed, max_depth=DEFAULT_MAX_DEPTH, include=None, exclude=None):
+        """初始化待爬佇列"""
+        self.site = site_of(seed)
+        self.max_depth = max_depth
+        self.include = [re.compile(pattern) for pattern in include or []]
+        self.exclude = [re.compile(pattern) for pattern in exclude or []]
+        self.queue = deque()
+        self.seen = set()
+
+    def in_scope(self, url):
+        """網址是否屬於同網站（含子網域）且符合包含/排除規則"""
+        host = (urlsplit(url).hostname or "").lower()
+        if host != self.site and not host.endswith("." + self.site):
+            return False
+        if urlsplit(url).path.lower().endswith(SKIPPED_EXTENSIONS):
+            return False
+        if self.include and not any(p.search(url) for p in self.include):
+            return False
+        return not any(p.search(url) for p in self.exclude)
+
+    def add(self, url, depth, base=None, check_scope=True):
+        """加入網址，已見過、超過深度或不在範圍內時回傳 False"""
+        normalized = normalize_url(url, base)
+        if not normalized or normalized in self.seen or depth > self.max_depth:
+            return False
+        if check_scope and not self.in_scope(normalized):
+            return False
+        self.seen.add(normalized)
+        self.queue.append((normalized, depth))
+        return True
+
+    def mark_seen(self, url):
+        """標記轉址後的最終網址，避免重複爬取"""
+        normalized = normalize_url(url)
+        if normalized:
+            self.seen.add(normalized)
+
+    def pop(self):
+        """取出下一個網址"""
+        return self.queue.popleft() if self.queue else None
+
+    def __len__(self):
+        """剩餘網址數量"""
+        return len(self.queue)
+
+
+class RobotsPolicy:
+    """robots.txt 規則：每個主機讀取一次，並快取於儲存後端"""
+
+    def __init__(self, user_agent="*", store=None, timeout=5):
+        """初始化 robots.txt 規則"""
+        self.user_agent = user_agent
+        self.store = store or create_store("robots")
+        self.timeout = timeout
+        self.parsers = {}
+
+    def _fetch(self, robots_url):
+        """下載 robots.txt，回傳 (狀態, 內容)"""
+        try:
+            request = Request(robots_url, headers={"User-Agent": self.user_agent})
+            with urlopen(request, timeout=self.timeout) as f:
+                return 200, f.read().decode("utf-8", errors="replace")
+        except HTTPError as e:
+            return e.code, ""
+        except Exception as e:
+            print(f"⚠️ 無法讀取 {robots_url}: {e}")
+            return None, ""
+
+    def _parser(self, url):
+        """取得網址所屬主機的解析器"""
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        if origin in self.parsers:
+            return self.parsers[origin]
+
+        cached = self.store.get(origin)
+        if cached is None:
+            status, text = self._fetch(f"{origin}/robots.txt")
+            cached = {"status": status, "text": text}
+            self.store.put(origin, cached, ttl=ROBOTS_TTL)
+
+        parser = RobotFileParser()
+        # 與 RobotFileParser.read 相同：401/403 全部禁止，其他錯誤全部允許
+        if cached["status"] in (401, 403):
+            parser.disallow_all = True
+        elif cached["status"] == 200:
+            parser.parse(cached["text"].splitlines())
+        else:
+            parser.allow_all = True
+        self.parsers[origin] = parser
+        return parser
+
+    def allowed(self, url):
+        """是否允許爬取"""
+        return self._parser(url).can_fetch(self.user_agent, url)
+
+    def crawl_delay(self, url):
+        """robots.txt 指定的 Crawl-delay（秒），未指定時回傳 None"""
+        delay = self._parser(url).crawl_delay(self.user_agent)
+        return float(delay) if delay is not None else None
+
+
+class HostThrottle:
+    """主機禮貌延遲：同一主機相鄰兩次請求開始的最短間隔"""
+
+    def __init__(self, delay=DEFAULT_DELAY, deadline=None):
+        """初始化主機延遲"""
+        self.delay = delay
+        self.deadline = deadline or Deadline()
+        self.next_allowed = {}
+
+    def wait(self, host, delay=None):
+        """等待直到可以對主機送出下一個請求"""
+        delay = self.delay if delay is None else max(self.delay, delay)
+        wait_time = self.next_allowed.get(host, 0) - time.time()
+        if wait_time > 0:
+            self.deadline.sleep(wait_time)
+        self.next_allowed[host] = time.time() + delay
+
+
+class SiteCrawler:
+    """同網站爬蟲"""
+
+    def __init__(
+        self,
+        driver,
+        sink=None,
+        deadline=None,
+        emulation=None,
+        isolated_context=None,
+        recorder=None,
+    ):
+        """初始化爬蟲（額外分頁開在 isolated_context 中，並套用 emulation 語系模擬與 recorder 效能指標）"""
+        self.driver = driver
+        self.sink = sink or create_artifact_sink()
+        self.deadline = deadline or Deadline()
+        self.emulation = emulation
+        self.isolated_context = isolated_context
+        self.recorder = recorder
+        self.extractor = ContentExtractor(driver)
+
+    def run(self, seed, options=None):
+        """從種子網址開始爬取，回傳爬取摘要與各頁面的成品參照"""
+        options = options or {}
+        max_pages = options.get("max_pages", DEFAULT_MAX_PAGES)
+        page_timeout = options.get("page_timeout", DEFAULT_PAGE_TIMEOUT)
+        tabs = max(1, min(int(options.get("tabs", 1)), MAX_TABS))
+        crawl_id = f"{int(time.time())}-{uuid.uuid4().hex[:8]}"
+
+        frontier = CrawlFrontier(
+            seed,
+            max_depth=options.get("max_depth", DEFAULT_MAX_DEPTH),
+            include=options.get("include"),
+            exclude=options.get("exclude"),
+        )
+        # 種子網址不受包含/排除規則限制
+        frontier.add(seed, 0, check_scope=False)
+        robots = (
+            RobotsPolicy(options.get("user_agent", "*"))
+            if options.get("respect_robots", True)
+            else None
+        )
+        throttle = HostThrottle(options.get("delay", DEFAULT_DELAY), self.deadline)
+
+        print(f"🕷️ 開始爬取 {seed} (最多 {max_pages} 頁, 深度 {frontier.max_depth}, {tabs} 分頁)")
+        crawl_start = time.time()
+        handles = self._open_tabs(tabs)
+        pages = []
+        blocked = []
+
+        try:
+            while frontier and len(pages) < max_pages:
+                if not self.deadline.has_time(PHASE_MIN_SECONDS["crawl_page"]):
+                    self.deadline.skip("crawl")
+                    break
+
+                # 取出這一輪要平行載入的網址（略過 robots.txt 禁止的網址）
+                batch = []
+                while frontier and len(batch) < min(tabs, max_pages - len(pages)):
+                    url, depth = frontier.pop()
+                    if robots and not robots.allowed(url):
+                        blocked.append(url)
+                        continue
+                    batch.append((url, depth))
+                if not batch:
+                    break
+
+                for handle, (url, depth) in zip(handles, batch):
+                    self.driver.switch_to.window(handle)
+                    throttle.wait(
+                        urlsplit(url).hostname,
+                        robots.crawl_delay(url) if robots else None,
+                    )
+                    self.driver.execute_script(START_NAVIGATION_SCRIPT, url)
+
+                for handle, (url, depth) in zip(handles, batch):
+                    self.driver.switch_to.window(handle)
+                    page = self._collect(url, depth, page_timeout, frontier, options)
+                    page["artifact"] = self._stream(crawl_id, len(pages) + 1, page)
+                    pages.append(self._summary(page))
+        finally:
+            self._close_tabs(handles)
+
+        crawl_time = time.time() - crawl_start
+        failed = sum(1 for page in pages if page.get("error"))
+        print(f"✅ 爬取完成 ({len(pages)} 頁, 失敗 {failed}, 耗時: {crawl_time:.2f}s)")
+
+        crawl = {
+            "id": crawl_id,
+            "seed": normalize_url(seed),
+            "pages_crawled": len(pages),
+            "pages_failed": failed,
+            "queued": len(frontier),
+            "blocked_by_robots": blocked,
+            "time": round(crawl_time, 3),
+        }
+        manifest = dict(crawl, pages=pages)
+        crawl["manifest"] = self.sink.save_bytes(
+            json.dumps(manifest, ensure_ascii=False).encode("utf-8"),
+            f"crawl/{crawl_id}/manifest.json",
+            "application/json",
+        )
+        return {
+            "success": True,
+            "url": seed,
+            "timestamp": int(time.time()),
+            "crawl": crawl,
+            "pages": pages,
+        }
+
+    def _open_tabs(self, count):
+        """在同一個瀏覽器中開啟額外分頁"""
+        handles = [self.driver.current_window_handle]
+        for _ in range(count - 1):
+            if self.isolated_context:
+                self.driver.switch_to.window(self.isolated_context.new_tab())
+            else:
+                self.driver.switch_to.new_window("tab")
+            handles.append(self.driver.current_window_handle)
+            if self.emulation:
+                self.emulation.apply()
+            if self.recorder:
+                self.recorder.enable()
+        return handles
+
+    def _close_tabs(self, handles):
+        """關閉額外分頁並切回第一個分頁"""
+        try:
+            for handle in handles[1:]:
+                self.driver.switch_to.window(handle)
+                self.driver.close()
+            self.driver.switch_to.window(handles[0])
+        except Exception as e:
+            print(f"⚠️ 無法關閉爬取分頁: {e}")
+
+    def _wait_ready(self, timeout):
+        """等待目前分頁載入完成，逾時後停止載入並回傳當下狀態"""
+        end = time.time() + self.deadline.clamp(timeout, minimum=1)
+        while time.time() < end:
+            try:
+                state = self.driver.execute_script(TAB_STATE_SCRIPT) or {}
+            except TimeoutException:
+                # ChromeDriver 等待分頁導航時已超過頁面載入逾時
+                break
+            if state.get("ready"):
+                return state
+            time.sleep(0.1)
+        try:
+            self.driver.execute_script("window.stop();")
+            state = self.driver.execute_script(TAB_STATE_SCRIPT) or {}
+        except TimeoutException:
+            state = {"pending": True}
+        state["timed_out"] = True
+        return state
+
+    @traced("crawl.page")
+    def _collect(self, url, depth, timeout, frontier, options):
+        """等待分頁載入後，以單次腳本擷取內容與連結，並把新連結加入待爬佇列"""
+        page_start = time.time()
+        page = {"url": url, "depth": depth}
+        try:
+            state = self._wait_ready(timeout)
+            page["status"] = state.get("status")
+            if state.get("pending"):
+                raise TimeoutError(f"頁面載入逾時 ({timeout}s)")
+            if state.get("error"):
+                raise Exception("頁面載入失敗（Chrome 錯誤頁）")
+            if state.get("timed_out"):
+                page["timed_out"] = True
+            page["final_url"] = state.get("url")
+            page["title"] = state.get("title")
+            frontier.mark_seen(page["final_url"])
+
+            extracted = self.extractor.extract(
+                options.get("selector", "html"),
+                text=options.get("text", True),
+                html=options.get("html", False),
+                links=True,
+            )
+            for field in ("text", "html"):
+                if field in extracted:
+                    page[field] = extracted[field]
+            if extracted.get("canonical"):
+                page["canonical"] = extracted["canonical"]
+
+            links = [
+                link["href"]
+                for link in extracted.get("links") or []
+                if options.get("follow_nofollow") or not link.get("nofollow")
+            ]
+            page["links"] = links
+            if (page["status"] or 200) < 400 and "nofollow" not in extracted.get(
+                "robots", ""
+            ):
+                page["queued"] = sum(
+                    frontier.add(link, depth + 1, base=page["final_url"])
+                    for link in links
+                )
+        except Exception as e:
+            print(f"⚠️ 爬取失敗 {url}: {str(e)[:100]}")
+            page["error"] = str(e)[:200]
+        page["time"] = round(time.time() - page_start, 3)
+        return page
+
+    def _stream(self, crawl_id, index, page):
+        """將單頁結果寫入成品輸出"""
+        try:
+            return self.sink.save_bytes(
+                json.dumps(page, ensure_ascii=False).encode("utf-8"),
+                f"crawl/{crawl_id}/pages/{index:05d}.json",
+                "application/json",
+            )
+        except Exception as e:
+            print(f"⚠️ 無法輸出爬取結果 {page['url']}: {e}")
+            return None
+
+    @staticmethod
+    def _summary(page):
+        """回應中每一頁只保留摘要，完整內容在成品中"""
+        summary = {
+            key: page[key]
+            for key in (
+                "url",
+                "final_url",
+                "depth",
+                "status",
+                "title",
+                "queued",
+                "timed_out",
+                "error",
+                "time",
+                "artifact",
+            )
+            if page.get(key) is not None
+        }
+        summary["link_count"] = len(page.get("links", []))
+        return summary
@@ -0,0 +1,94 @@
+"""
+執行期限模組
+Deadline Module
+此模組根據 Lambda 剩餘時間與請求期限計算時間預算，讓各階段的等待自動縮短
+"""
+
+import time
+
+# 保留給回應序列化與關閉瀏覽器的時間
+DEFAULT_RESERVE_MS = 2000
+
+# 各階段至少需要的秒數，不足時略過該階段並回傳部分結果
+PHASE_MIN_SECONDS = {
+    "browser_launch": 3.0,
+    "navigation": 1.0,
+    "screenshot": 2.0,
+    "pdf": 3.0,
+    "viewport": 2.0,
+    "dom": 2.0,
+    "crawl_page": 3.0,
+}
+
+
+class Deadline:
+    """執行期限預算"""
+
+    def __init__(self, budget_ms=None):
+        """初始化期限，budget_ms 為 None 時表示沒有限制"""
+        self.start = time.time()
+        self.budget_ms = budget_ms
+        self.end = self.start + budget_ms / 1000 if budget_ms is not None else None
+        self.skipped = []
+
+    @classmethod
+    def from_context(
+        cls, context=None, deadline_ms=None, reserve_ms=DEFAULT_RESERVE_MS
+    ):
+        """由 Lambda context 剩餘時間與請求的 deadline_ms 取較小者"""
+        budgets = []
+        if context is not None and hasattr(context, "get_remaining_time_in_millis"):
+            budgets.append(context.get_remaining_time_in_millis() - reserve_ms)
+        if deadline_ms:
+            budgets.append(deadline_ms)
+        budget_ms = max(0, min(budgets)) if budgets else None
+        if budget_ms is not None:
+            print(f"⏰ 執行期限: {budget_ms / 1000:.1f}s")
+        return cls(budget_ms)
+
+    def remaining(self):
+        """剩餘秒數（無限制時回傳 None）"""
+        if self.end is None:
+            return None
+        return max(0.0, self.end - time.time())
+
+    def clamp(self, timeout, minimum=0.0):
+        """將等待時間縮短到不超過剩餘時間"""
+        remaining = self.remaining()
+        if remaining is None:
+            return timeout
+        return max(minimum, min(timeout, remaining))
+
+    def sleep(self, seconds):
+        """在期限內休眠"""
+        duration = self.clamp(seconds)
+        if duration > 0:
+            time.sleep(duration)
+
+    def has_time(self, seconds):
+        """剩餘時間是否足夠執行需要 seconds 秒的階段"""
+        remaining = self.remaining()
+        return remaining is None or remaining >= seconds
+
+    def expired(self):
+        """期限是否已到"""
+        return not self.has_time(0.001)
+
+    def skip(self, phase):
+        """記錄因時間不足而略過的階段"""
+        print(f"⏰ 時間不足，略過: {phase}")
+        self.skipped.append(phase)
+
+    @property
+    def partial(self):
+        """是否有階段因時間不足被略過"""
+        return bool(self.skipped)
+
+    def summary(self):
+        """期限使用摘要"""
+        remaining = self.remaining()
+        return {
+            "budget_ms": self.budget_ms,
+            "elapsed_ms": int((time.time() - self.start) * 1000),
+            "remaining_ms": int(remaining * 1000) if remaining is not None else None,
+        }
@@ -0,0 +1,166 @@
+"""
+主文件回應模組
+Document Response Module
+此模組由 DevTools 網路事件記錄導航主文件的狀態碼、內容類型與轉址鏈，並取得非 HTML 回應的原始內容
+"""
+
+import base64
+import threading
+import time
+import uuid
+from browser_handler import DevToolsSocket
+from storage_handler import INLINE_LIMIT, create_artifact_sink
+
+# 視為網頁、需要完整載入流程的內容類型
+HTML_TYPES = ("text/html", "application/xhtml+xml")
+
+# 以文字回傳的非 HTML 內容類型（其餘以 base64 回傳）
+TEXT_TYPES = ("text/", "application/json", "application/xml", "application/javascript")
+
+
+def is_html(content_type):
+    """內容類型是否為網頁（未知時視為網頁）"""
+    return not content_type or content_type in HTML_TYPES
+
+
+class DocumentWatcher:
+    """
+    主文件監看器：以獨立的 DevTools 連線在背景接收分頁的網路事件，
+    記錄主框架文件的轉址鏈與最終回應；非 HTML 回應於下載完成後取得內容
+    """
+
+    def __init__(self, port, target_id, timeout=10):
+        """初始化主文件監看器（target_id 即 Selenium 視窗代碼，也是主框架 id）"""
+        self.port = port
+        self.target_id = target_id
+        self.timeout = timeout
+        self.devtools = None
+        self.thread = None
+        self.lock = threading.Lock()
+        self.response_ready = threading.Event()
+        self.body_ready = threading.Event()
+        self._reset_document()
+
+    def _reset_document(self):
+        """新的導航開始時清除上一次的紀錄"""
+        self.request_id = None
+        self.redirects = []
+        self.document = None
+        self.body = None
+        self.body_command = None
+        self.response_ready.clear()
+        self.body_ready.clear()
+
+    def start(self):
+        """連線並啟用網路事件（回傳時已開始記錄，可以開始導航）"""
+        self.devtools = DevToolsSocket.page(self.port, self.target_id, self.timeout)
+        self.devtools.call("Network.enable", {})
+        self.devtools.ws.settimeout(None)
+        self.thread = threading.Thread(
+            target=self._run, name="document-watcher", daemon=True
+        )
+        self.thread.start()
+        return self
+
+    def _run(self):
+        """處理網路事件，直到連線關閉"""
+        try:
+            while True:
+                message = self.devtools.receive()
+                with self.lock:
+                    self._handle(message)
+        except Exception:
+            # 連線關閉（stop 或分頁關閉）時結束
+            pass
+
+    def _handle(self, message):
+        """依事件更新主文件紀錄"""
+        if self.body_command is not None and message.get("id") == self.body_command:
+            self.body = message.get("result") or {
+                "error": (message.get("error") or {}).get("message")
+            }
+            self.body_command = None
+            self.body_ready.set()
+            return
+
+        method = message.get("method")
+        params = message.get("params", {})
+        if method == "Network.requestWillBeSent":
+            if (
+                params.get("type") != "Document"
+                or params.get("frameId") != self.target_id
+            ):
+                return
+            redirect = params.get("redirectResponse")
+            if redirect and params["requestId"] == self.request_id:
+                # 轉址沿用同一個 requestId
+                self.redirects.append(
+                    {"url": redirect.get("url"), "status": redirect.get("status")}
+                )
+            else:
+                self._reset_document()
+                self.request_id = params["requestId"]
+        elif params.get("requestId") != self.request_id or self.request_id is None:
+            return
+        elif method == "Network.responseReceived":
+            response = params.get("response", {})
+            self.document = {
+                "url": response.get("url"),
+                "status": response.get("status"),
+                "content_type": (response.get("mimeType") or "").lower() or None,
+                "redirects": list(self.redirects),
+            }
+            self.response_ready.set()
+        elif method == "Network.loadingFinished":
+            if self.document and not is_html(self.document["content_type"]):
+                self.document["size"] = int(params.get("encodedDataLength", 0))
+                self.body_command = self.devtools.send(
+                    "Network.getResponseBody", {"requestId": self.request_id}
+                )
+        elif method == "Network.loadingFailed":
+            self.document = dict(
+                self.document or {"redirects": list(self.redirects)},
+                error=params.get("errorText"),
+            )
+            self.response_ready.set()
+            self.body_ready.set()
+
+    def reset(self):
+        """導航前清除上一次的紀錄"""
+        with self.lock:
+            self._reset_document()
+
+    def result(self, timeout=1):
+        """回傳最近一次導航的主文件回應（導航已完成時事件通常已到達）"""
+        self.response_ready.wait(timeout)
+        with self.lock:
+            return dict(self.document) if self.document else None
+
+    def read_body(self, sink=None, timeout=5):
+        """取得非 HTML 主文件的內容：文字直接回傳，二進位以 base64 回傳，過大時寫入成品輸出"""
+        if not self.body_ready.wait(timeout):
+            return {"body_error": "未能在時限內取得回應內容"}
+        with self.lock:
+            body = self.body or {}
+            content_type = (self.document or {}).get("content_type") or ""
+        if "body" not in body:
+            return {"body_error": body.get("error") or "無法取得回應內容"}
+
+        data = body["body"]
+        base64_encoded = body.get("base64Encoded", False)
+        if len(data) > INLINE_LIMIT:
+            sink = sink or create_artifact_sink()
+            name = f"documents/{int(time.time())}-{uuid.uuid4().hex[:8]}"
+            encoded = base64.b64decode(data) if base64_encoded else data.encode("utf-8")
+            return {"body_artifact": sink.save_bytes(encoded, name, content_type)}
+        if not base64_encoded:
+            return {"body": data}
+        if content_type.startswith(TEXT_TYPES):
+            return {"body": base64.b64decode(data).decode("utf-8", "replace")}
+        return {"body_base64": data}
+
+    def stop(self):
+        """停止監看（關閉連線時 DevTools 自動停用網路事件）"""
+        if self.devtools:
+            self.devtools.close()
+            self.devtools = None
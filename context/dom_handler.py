@@ -0,0 +1,153 @@
+"""
+DOM 快照模組
+DOM Snapshot Module
+此模組以單次 DevTools 呼叫取得攤平的 DOM、版面位置與指定的計算樣式，輸出以字串表索引的欄位格式
+"""
+
+import json
+import time
+import uuid
+from storage_handler import INLINE_LIMIT, create_artifact_sink
+from tracing_handler import traced
+
+SNAPSHOT_FORMAT = "dom-snapshot/1"
+
+# 預設擷取的計算樣式
+DEFAULT_STYLES = (
+    "display",
+    "visibility",
+    "opacity",
+    "position",
+    "font-family",
+    "font-size",
+    "font-weight",
+    "color",
+    "background-color",
+)
+
+
+def _rare_values(rare, size, default=-1):
+    """將 DevTools 稀疏欄位（index/value 陣列）展開為與節點等長的欄位"""
+    values = [default] * size
+    for index, value in zip(rare.get("index", []), rare.get("value", [])):
+        values[index] = value
+    return values
+
+
+# JSON 以 \u00XX 表示的控制字元
+_CONTROL_CHARS = dict.fromkeys(range(32))
+
+
+def _inline_size(value):
+    """
+    不實際序列化，估算快照內嵌於回應時的位元組數上限：使用預設分隔符、非 ASCII 以 \\uXXXX 表示，
+    並計入 API Gateway 回應再次跳脫引號與反斜線所增加的位元組（整數欄位以最長的數字計算）
+    """
+    if isinstance(value, str):
+        ascii_chars = len(value.encode("ascii", "ignore"))
+        units = len(value.encode("utf-16-le")) // 2
+        escaped = value.count('"') + value.count("\\")
+        control = len(value) - len(value.translate(_CONTROL_CHARS))
+        return ascii_chars + 6 * (units - ascii_chars) + 3 * escaped + 6 * control + 4
+    if isinstance(value, dict):
+        return 2 + sum(len(key) + 8 + _inline_size(item) for key, item in value.items())
+    if isinstance(value, list):
+        if value and type(value[0]) is int:
+            return 2 + len(value) * (len(str(max(value, key=abs))) + 2)
+        return 2 + sum(_inline_size(item) + 2 for item in value)
+    return len(json.dumps(value))
+
+
+class DomSnapshotter:
+    """DOM 快照擷取器"""
+
+    def __init__(self, driver, sink=None):
+        """初始化 DOM 快照擷取器"""
+        self.driver = driver
+        self.sink = sink
+
+    @traced("dom.snapshot")
+    def capture(self, options=None):
+        """擷取 DOM 快照，過大時寫入成品輸出並回傳參照"""
+        options = options or {}
+        styles = list(options.get("styles") or DEFAULT_STYLES)
+
+        print("🌳 開始擷取 DOM 快照...")
+        snapshot_start = time.time()
+        raw = self.driver.execute_cdp_cmd(
+            "DOMSnapshot.captureSnapshot", {"computedStyles": styles}
+        )
+        snapshot = self.compact(raw, styles)
+        capture_time = time.time() - snapshot_start
+
+        # 回傳內容由 Lambda 序列化，這裡只估算上限；INLINE_LIMIT 低於 6 MB 的回應上限，
+        # 保留其餘欄位的空間；寫入成品時才序列化
+        size = _inline_size(snapshot)
+        node_count = sum(len(doc["nodes"]["parent"]) for doc in snapshot["documents"])
+        result = {
+            "dom_nodes": node_count,
+            "dom_size": size,
+            "dom_time": round(capture_time, 3),
+        }
+
+        to_artifact = options.get("artifact", "auto")
+        if to_artifact is True or (to_artifact == "auto" and size > INLINE_LIMIT):
+            encoded = json.dumps(
+                snapshot, ensure_ascii=False, separators=(",", ":")
+            ).encode("utf-8")
+            result["dom_size"] = size = len(encoded)
+            sink = self.sink or create_artifact_sink()
+            name = f"dom/{int(time.time())}-{uuid.uuid4().hex[:8]}.json"
+            result["dom_artifact"] = sink.save_bytes(encoded, name, "application/json")
+        else:
+            result["dom"] = snapshot
+
+        print(
+            f"✅ DOM 快照完成 (節點: {node_count}, 大小: {size} bytes, 耗時: {capture_time:.2f}s)"
+        )
+        return result
+
+    @staticmethod
+    def compact(raw, styles):
+        """
+        轉換為精簡的欄位格式：所有字串以 strings 表的索引表示（-1 代表無值），
+        每個文件包含節點欄位與版面欄位，版面位置四捨五入為整數像素
+        """
+        documents = []
+        for doc in raw.get("documents", []):
+            nodes = doc.get("nodes", {})
+            size = len(nodes.get("parentIndex", []))
+            layout = doc.get("layout", {})
+            documents.append(
+                {
+                    "url": doc.get("documentURL", -1),
+                    "title": doc.get("title", -1),
+                    "frame_id": doc.get("frameId", -1),
+                    "nodes": {
+                        "parent": nodes.get("parentIndex", []),
+                        "type": nodes.get("nodeType", []),
+                        "name": nodes.get("nodeName", []),
+                        "value": nodes.get("nodeValue", []),
+                        "attributes": nodes.get("attributes", []),
+                        "input_value": _rare_values(nodes.get("inputValue", {}), size),
+                        "content_document": _rare_values(
+                            nodes.get("contentDocumentIndex", {}), size
+                        ),
+                    },
+                    "layout": {
+                        "node": layout.get("nodeIndex", []),
+                        "bounds": [
+                            [round(value) for value in bounds]
+                            for bounds in layout.get("bounds", [])
+                        ],
+                        "text": layout.get("text", []),
+                        "styles": layout.get("styles", []),
+                    },
+                }
+            )
+        return {
+            "format": SNAPSHOT_FORMAT,
+            "styles": styles,
+            "strings": raw.get("strings", []),
+            "documents": documents,
+        }
@@ -0,0 +1,94 @@
+"""
+語系模擬模組
+Locale Emulation Module
+此模組以 DevTools 模擬語系、時區、User-Agent 與 Accept-Language，不需重新啟動瀏覽器即可切換
+"""
+
+EMULATION_KEYS = ("locale", "timezone", "user_agent", "accept_language")
+
+
+def parse_emulation(payload):
+    """取出並驗證模擬設定，未指定任何設定時回傳空字典"""
+    options = {}
+    for key in EMULATION_KEYS:
+        value = payload.get(key)
+        if value is None:
+            continue
+        if not isinstance(value, str) or not value.strip():
+            raise ValueError(f"{key} 必須是非空字串")
+        options[key] = value.strip()
+    return options
+
+
+def default_accept_language(locale):
+    """由語系推導 Accept-Language（例如 zh-HK → zh-HK,zh;q=0.9）"""
+    language = locale.replace("_", "-").split("-")[0]
+    if language == locale:
+        return locale
+    return f"{locale},{language};q=0.9"
+
+
+class LocaleEmulator:
+    """語系模擬器：設定套用於目前分頁，新分頁需再次套用"""
+
+    def __init__(self, driver, options):
+        """初始化語系模擬器"""
+        self.driver = driver
+        self.options = dict(options)
+        if "locale" in self.options and "accept_language" not in self.options:
+            # navigator.language 取自 Accept-Language 的第一個語言
+            self.options["accept_language"] = default_accept_language(
+                self.options["locale"]
+            )
+        self.default_user_agent = None
+
+    def apply(self):
+        """將模擬設定套用到目前分頁，回傳實際套用的設定"""
+        if "locale" in self.options:
+            self.driver.execute_cdp_cmd(
+                "Emulation.setLocaleOverride", {"locale": self.options["locale"]}
+            )
+        if "timezone" in self.options:
+            try:
+                self.driver.execute_cdp_cmd(
+                    "Emulation.setTimezoneOverride",
+                    {"timezoneId": self.options["timezone"]},
+                )
+            except Exception as e:
+                raise ValueError(f"無效的時區: {self.options['timezone']} ({e})")
+        if "user_agent" in self.options or "accept_language" in self.options:
+            user_agent = self.options.get("user_agent") or self._default_user_agent()
+            self.driver.execute_cdp_cmd(
+                "Network.setUserAgentOverride",
+                {
+                    "userAgent": user_agent,
+                    "acceptLanguage": self.options.get("accept_language", ""),
+                },
+            )
+        print(f"🌏 已套用語系模擬: {', '.join(f'{k}={v}' for k, v in self.options.items())}")
+        return dict(self.options)
+
+    def reset(self):
+        """清除目前分頁的模擬設定，避免影響重複使用的瀏覽器"""
+        try:
+            if "locale" in self.options:
+                self.driver.execute_cdp_cmd("Emulation.setLocaleOverride", {})
+            if "timezone" in self.options:
+                self.driver.execute_cdp_cmd(
+                    "Emulation.setTimezoneOverride", {"timezoneId": ""}
+                )
+            if "user_agent" in self.options or "accept_language" in self.options:
+                self.driver.execute_cdp_cmd(
+                    "Network.setUserAgentOverride",
+                    {"userAgent": self._default_user_agent()},
+                )
+        except Exception as e:
+            print(f"⚠️ 無法清除語系模擬: {e}")
+
+    def _default_user_agent(self):
+        """瀏覽器原本的 User-Agent（不受覆寫影響）"""
+        if self.default_user_agent is None:
+            self.default_user_agent = self.driver.execute_cdp_cmd(
+                "Browser.getVersion", {}
+            )["userAgent"]
+        return self.default_user_agent
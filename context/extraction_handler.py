@@ -0,0 +1,105 @@
+"""
+內容擷取模組
+Content Extraction Module
+此模組以單次頁面內腳本取得元素文字、HTML 與位置，減少 WebDriver 往返次數
+"""
+
+import time
+from tracing_handler import traced
+
+# 解析 CSS/XPath 選擇器並一次回傳需要的欄位
+ELEMENT_SCRIPT = """
+const selector = arguments[0];
+const opts = arguments[1] || {};
+
+if (opts.scrollTop) {
+    window.scrollTo(0, 0);
+}
+
+let el = null;
+let error = null;
+try {
+    if (selector.startsWith('//')) {
+        el = document.evaluate(
+            selector, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null
+        ).singleNodeValue;
+    } else {
+        el = document.querySelector(selector);
+    }
+    if (!el) error = 'no such element: ' + selector;
+} catch (e) {
+    error = String(e);
+}
+
+const result = {found: !!el, error: error};
+const target = el || document.body;
+
+if (opts.text) {
+    result.text = target ? target.innerText : '';
+}
+if (opts.html) {
+    result.html = el ? el.innerHTML : document.documentElement.outerHTML;
+}
+if (opts.rect && el) {
+    const r = el.getBoundingClientRect();
+    result.rect = {
+        x: r.left + window.scrollX,
+        y: r.top + window.scrollY,
+        width: r.width,
+        height: r.height
+    };
+}
+if (opts.links) {
+    // 連結以 a.href 取得瀏覽器解析後的絕對網址，並標記 nofollow
+    const robots = document.querySelector('meta[name="robots" i]');
+    const canonical = document.querySelector('link[rel="canonical"]');
+    const seen = new Set();
+    result.links = [];
+    for (const a of document.querySelectorAll('a[href]')) {
+        const href = a.href;
+        if (!/^https?:/i.test(href) || seen.has(href)) continue;
+        seen.add(href);
+        const rel = (a.getAttribute('rel') || '').toLowerCase();
+        result.links.push(rel.includes('nofollow') ? {href: href, nofollow: true} : {href: href});
+    }
+    result.robots = robots ? (robots.getAttribute('content') || '').toLowerCase() : '';
+    result.canonical = canonical ? canonical.href : null;
+}
+return result;
+"""
+
+
+class ContentExtractor:
+    """頁面內容擷取器"""
+
+    def __init__(self, driver):
+        """初始化內容擷取器"""
+        self.driver = driver
+
+    @traced("extract")
+    def extract(
+        self, selector, text=True, html=True, rect=False, scroll_top=False, links=False
+    ):
+        """以單次腳本取得選擇器對應元素的內容（可同時收集頁面連結）"""
+        extract_start = time.time()
+        result = self.driver.execute_script(
+            ELEMENT_SCRIPT,
+            selector,
+            {
+                "text": text,
+                "html": html,
+                "rect": rect,
+                "scrollTop": scroll_top,
+                "links": links,
+            },
+        )
+        print(
+            f"📄 內容擷取完成 (元素: {'✅' if result.get('found') else '❌'}, 耗時: {time.time() - extract_start:.2f}s)"
+        )
+        return result
+
+    def locate(self, selector, scroll_top=True):
+        """取得元素在文件中的位置（可同時滾動到頂部）"""
+        return self.extract(
+            selector, text=False, html=False, rect=True, scroll_top=scroll_top
+        )
@@ -5,6 +5,82 @@ Font Handler Module
 """
 
 
+# 取樣文字節點，統計 CJK 字元、實際使用的字體，並以 canvas 比對是否顯示為缺字方塊
+CJK_PROBE_SCRIPT = r"""
+const maxNodes = arguments[0] || 200;
+const cjkPattern = /[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af]/g;
+const root = document.body || document.documentElement;
+const walker = document.createTreeWalker(root, NodeFilter.SHOW_TEXT);
+
+let sampledNodes = 0;
+let cjkChars = 0;
+const chars = new Set();
+const families = {};
+while (sampledNodes < maxNodes && walker.nextNode()) {
+    const text = walker.currentNode.nodeValue;
+    if (!text || !text.trim()) continue;
+    sampledNodes++;
+    const matches = text.match(cjkPattern);
+    if (!matches) continue;
+    cjkChars += matches.length;
+    for (const c of matches) {
+        if (chars.size >= 16) break;
+        chars.add(c);
+    }
+    const parent = walker.currentNode.parentElement;
+    if (parent) {
+        const family = getComputedStyle(parent).fontFamily;
+        families[family] = (families[family] || 0) + matches.length;
+    }
+}
+
+let primaryFamily = null;
+for (const family in families) {
+    if (!primaryFamily || families[family] > families[primaryFamily]) primaryFamily = family;
+}
+
+const webFonts = [];
+if (document.fonts) {
+    document.fonts.forEach(f => {
+        if (f.status === 'loaded') webFonts.push(f.family.replace(/["']/g, ''));
+    });
+}
+
+// 與一定沒有字形的字元比對像素，相同即為缺字方塊
+let tofuRatio = null;
+if (chars.size) {
+    const canvas = document.createElement('canvas');
+    canvas.width = 24;
+    canvas.height = 24;
+    const ctx = canvas.getContext('2d', {willReadFrequently: true});
+    ctx.font = '20px ' + (primaryFamily || 'sans-serif');
+    ctx.textBaseline = 'top';
+    const draw = (c) => {
+        ctx.clearRect(0, 0, 24, 24);
+        ctx.fillText(c, 0, 0);
+        const data = ctx.getImageData(0, 0, 24, 24).data;
+        let h = 0;
+        for (let i = 3; i < data.length; i += 4) h = (Math.imul(h, 31) + data[i]) | 0;
+        return h;
+    };
+    const missing = draw('\u{10FFFD}');
+    let tofu = 0;
+    for (const c of chars) {
+        if (draw(c) === missing) tofu++;
+    }
+    tofuRatio = tofu / chars.size;
+}
+
+return {
+    sampledNodes: sampledNodes,
+    cjkChars: cjkChars,
+    primaryFamily: primaryFamily,
+    webFonts: Array.from(new Set(webFonts)).slice(0, 20),
+    tofuRatio: tofuRatio
+};
+"""
+
+
 class ChineseFontHandler:
     """中文字體處理器"""
 
@@ -182,6 +258,41 @@ class ChineseFontHandler:
             }
         """
 
+    def probe_cjk_rendering(self, driver, max_nodes=200):
+        """檢測頁面是否需要注入中文字體，回傳決策與原因"""
+        try:
+            probe = driver.execute_script(CJK_PROBE_SCRIPT, max_nodes) or {}
+        except Exception as e:
+            print(f"⚠️ 字體檢測失敗，預設注入字體: {e}")
+            return {"apply": True, "reason": "probe_failed"}
+
+        primary_family = (probe.get("primaryFamily") or "").lower()
+        uses_web_font = any(
+            font.lower() in primary_family for font in probe.get("webFonts", [])
+        )
+
+        if not probe.get("cjkChars"):
+            apply, reason = False, "no_cjk"
+        elif probe.get("tofuRatio"):
+            apply, reason = True, "missing_glyphs"
+        elif uses_web_font:
+            apply, reason = False, "page_web_fonts"
+        else:
+            apply, reason = False, "system_fonts_ok"
+
+        print(
+            f"🔎 字體檢測: CJK {probe.get('cjkChars', 0)} 字, 缺字比例 {probe.get('tofuRatio')}, "
+            f"{'需要注入' if apply else '略過注入'} ({reason})"
+        )
+        return {
+            "apply": apply,
+            "reason": reason,
+            "cjk_chars": probe.get("cjkChars", 0),
+            "tofu_ratio": probe.get("tofuRatio"),
+            "primary_family": probe.get("primaryFamily"),
+            "web_fonts": probe.get("webFonts", []),
+        }
+
     def apply_basic_fonts(self, driver):
         """應用基本中文字體優化"""
         try:
@@ -349,14 +460,83 @@ class ChromeOptionsBuilder:
     @staticmethod
     def get_font_options():
         """獲取字體渲染優化選項（不包含語系設定）"""
+        # 與線上截圖使用的設定一致：灰階抗鋸齒、不做 hinting
         return [
             "--enable-font-antialiasing",
             "--force-device-scale-factor=1",
-            "--font-render-hinting=full",
-            "--enable-lcd-text",
+            "--font-render-hinting=none",
+            "--disable-lcd-text",
             "--disable-font-subpixel-positioning",
         ]
 
+    @staticmethod
+    def get_locale_options(lang="zh-TW"):
+        """獲取語系選項"""
+        return [f"--lang={lang}"]
+
+    @staticmethod
+    def get_chinese_font_feature_options():
+        """獲取中文字體相關的功能開關"""
+        return [
+            "--enable-features=FontAccessAPI",
+            "--disable-features=VizDisplayCompositor",
+            "--disable-site-isolation-trials",
+        ]
+
+    @staticmethod
+    def get_text_fast_options():
+        """獲取純文字擷取選項：不載入圖片與網路字體，關閉非必要功能"""
+        return [
+            "--blink-settings=imagesEnabled=false",
+            "--disable-remote-fonts",
+            "--mute-audio",
+            "--disable-notifications",
+            "--disable-default-apps",
+            "--disable-component-update",
+            "--disable-domain-reliability",
+            "--disable-features=Translate,MediaRouter,OptimizationHints,VizDisplayCompositor",
+        ]
+
+    @staticmethod
+    def get_screenshot_hq_options():
+        """獲取高品質截圖選項"""
+        return [
+            "--force-color-profile=srgb",
+            "--hide-scrollbars",
+            "--enable-features=FontAccessAPI",
+            "--disable-features=VizDisplayCompositor",
+        ]
+
+    @staticmethod
+    def get_low_memory_options():
+        """獲取低記憶體選項"""
+        return [
+            "--js-flags=--max-old-space-size=192",
+            "--disk-cache-size=1048576",
+            "--media-cache-size=1",
+            "--renderer-process-limit=1",
+            "--disable-back-forward-cache",
+            "--disable-features=VizDisplayCompositor,BackForwardCache",
+        ]
+
+    @staticmethod
+    def merge_feature_flags(options):
+        """合併重複的 --enable-features/--disable-features（Chrome 只採用最後一個）"""
+        merged = []
+        features = {"--enable-features=": [], "--disable-features=": []}
+        for option in options:
+            prefix = next((p for p in features if option.startswith(p)), None)
+            if prefix:
+                for feature in option[len(prefix) :].split(","):
+                    if feature and feature not in features[prefix]:
+                        features[prefix].append(feature)
+            elif option not in merged:
+                merged.append(option)
+        merged.extend(
+            f"{prefix}{','.join(names)}" for prefix, names in features.items() if names
+        )
+        return merged
+
     @staticmethod
     def get_network_options():
         """獲取網路優化選項"""
@@ -376,3 +556,30 @@ class ChromeOptionsBuilder:
         options.extend(ChromeOptionsBuilder.get_font_options())
         options.extend(ChromeOptionsBuilder.get_network_options())
         return options
+
+    @staticmethod
+    def get_profile_options(profile="default"):
+        """獲取具名啟動設定檔的選項"""
+        builder = ChromeOptionsBuilder
+        options = builder.get_base_options()
+        if profile == "text-fast":
+            options += builder.get_performance_options()
+            options += builder.get_network_options()
+            options += builder.get_text_fast_options()
+        elif profile == "screenshot-hq":
+            options += builder.get_performance_options()
+            options += builder.get_network_options()
+            options += builder.get_font_options()
+            options += builder.get_locale_options()
+            options += builder.get_screenshot_hq_options()
+        elif profile == "low-memory":
+            options += builder.get_network_options()
+            options += builder.get_low_memory_options()
+            options += builder.get_locale_options()
+        else:
+            options += builder.get_performance_options()
+            options += builder.get_network_options()
+            options += builder.get_font_options()
+            options += builder.get_locale_options()
+            options += builder.get_chinese_font_feature_options()
+        return builder.merge_feature_flags(options)
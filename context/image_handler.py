@@ -0,0 +1,248 @@
+"""
+截圖影像處理模組
+Screenshot Image Module
+此模組負責計算截圖的感知雜湊、略過與上一次視覺上相同的截圖，並在背景執行緒產生縮圖與不同格式的版本
+"""
+
+import base64
+import hashlib
+import io
+import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from storage_handler import create_store
+
+try:
+    import numpy as np
+    from PIL import Image
+except ImportError:
+    np = None
+    Image = None
+
+HASH_SIZE = 8
+DCT_SIZE = 32
+
+# 縮圖版本支援的格式與上限
+RENDITION_FORMATS = {"png": "PNG", "jpeg": "JPEG", "jpg": "JPEG", "webp": "WEBP"}
+MAX_RENDITIONS = 8
+RENDITION_WORKERS = int(os.environ.get("RENDITION_WORKERS", "2"))
+
+_dct_matrix = None
+_rendition_executor = None
+
+
+def _get_dct_matrix():
+    """建立（並快取）DCT-II 轉換矩陣"""
+    global _dct_matrix
+    if _dct_matrix is None:
+        n = np.arange(DCT_SIZE)
+        matrix = np.cos(np.pi * (2 * n[None, :] + 1) * n[:, None] / (2 * DCT_SIZE))
+        matrix[0, :] *= 1 / np.sqrt(2)
+        _dct_matrix = (matrix * np.sqrt(2 / DCT_SIZE)).astype(np.float32)
+    return _dct_matrix
+
+
+def perceptual_hash(png_bytes):
+    """計算 64-bit DCT 感知雜湊（pHash），回傳 16 位十六進位字串"""
+    image = Image.open(io.BytesIO(png_bytes))
+
+    # 先以整數倍縮小再轉灰階，避免對整張大圖做色彩轉換
+    factor = max(1, min(image.size) // (DCT_SIZE * 4))
+    if factor > 1:
+        image = image.reduce(factor)
+    image = image.convert("L").resize((DCT_SIZE, DCT_SIZE), Image.BILINEAR)
+
+    pixels = np.asarray(image, dtype=np.float32)
+    dct = _get_dct_matrix()
+    low = (dct @ pixels @ dct.T)[:HASH_SIZE, :HASH_SIZE].flatten()
+
+    # 排除 DC 係數計算中位數
+    bits = low > np.median(low[1:])
+    value = int.from_bytes(np.packbits(bits).tobytes(), "big")
+    return f"{value:016x}"
+
+
+def hamming_distance(hash_a, hash_b):
+    """計算兩個十六進位雜湊的漢明距離"""
+    return bin(int(hash_a, 16) ^ int(hash_b, 16)).count("1")
+
+
+class ScreenshotDeduplicator:
+    """截圖去重器：與同一 URL 與視窗大小的上一張截圖比較"""
+
+    def __init__(self, store=None, threshold=5):
+        """初始化截圖去重器"""
+        self.store = store or create_store("screenshots")
+        self.threshold = threshold
+
+    @staticmethod
+    def make_key(url, viewport, selector=None):
+        """產生 URL 與視窗大小（及元素選擇器）的儲存鍵"""
+        key = f"{url}|{viewport['width']}x{viewport['height']}"
+        return f"{key}|{selector}" if selector else key
+
+    def check(self, key, png_bytes):
+        """比較截圖雜湊，距離低於門檻時標記為重複"""
+        hash_start = time.time()
+        phash = perceptual_hash(png_bytes)
+        hash_time = time.time() - hash_start
+
+        previous = self.store.get(key)
+        result = {
+            "phash": phash,
+            "hash_time_ms": round(hash_time * 1000, 2),
+            "duplicate": False,
+        }
+
+        if previous:
+            distance = hamming_distance(previous["phash"], phash)
+            result["distance"] = distance
+            if distance <= self.threshold:
+                # 保留原紀錄，讓後續比較仍以原始截圖為基準
+                result["duplicate"] = True
+                result["reference"] = {
+                    "screenshot_id": previous["screenshot_id"],
+                    "captured_at": previous["captured_at"],
+                }
+                print(f"♻️ 截圖與上一張相同 (距離: {distance}, 雜湊耗時: {hash_time * 1000:.1f}ms)")
+                return result
+
+        result["screenshot_id"] = hashlib.sha1(png_bytes).hexdigest()[:16]
+        self.store.put(
+            key,
+            {
+                "phash": phash,
+                "screenshot_id": result["screenshot_id"],
+                "captured_at": int(time.time()),
+            },
+        )
+        print(f"🆕 新截圖 (pHash: {phash}, 雜湊耗時: {hash_time * 1000:.1f}ms)")
+        return result
+
+
+def base64_size(data):
+    """base64 字串解碼後的位元組數（不需實際解碼）"""
+    return len(data) * 3 // 4 - data[-2:].count("=")
+
+
+def create_deduplicator(option):
+    """依請求參數建立截圖去重器，未啟用或缺少影像套件時回傳 None"""
+    if not option:
+        return None
+    if np is None or Image is None:
+        print("⚠️ 缺少 numpy/Pillow，略過截圖去重")
+        return None
+    options = option if isinstance(option, dict) else {}
+    return ScreenshotDeduplicator(threshold=options.get("threshold", 5))
+
+
+def parse_renditions(option):
+    """驗證並補齊縮圖版本設定，未啟用或缺少 Pillow 時回傳空列表"""
+    if not option:
+        return []
+    if Image is None:
+        print("⚠️ 缺少 Pillow，略過縮圖版本")
+        return []
+
+    renditions = []
+    for spec in option[:MAX_RENDITIONS]:
+        fmt = str(spec.get("format", "jpeg")).lower()
+        if fmt not in RENDITION_FORMATS:
+            raise ValueError(f"不支援的縮圖格式: {fmt}")
+        width = int(spec["width"])
+        if width <= 0:
+            raise ValueError(f"縮圖寬度必須大於 0: {width}")
+        renditions.append(
+            {"width": width, "format": fmt, "quality": int(spec.get("quality", 80))}
+        )
+    return renditions
+
+
+def _encode_rendition(image, spec, source_bytes):
+    """縮放並編碼單一版本，回傳版本資訊與 base64 內容"""
+    encode_start = time.time()
+    fmt = RENDITION_FORMATS[spec["format"]]
+
+    if spec["width"] >= image.width and fmt == "PNG":
+        # 原尺寸 PNG 直接沿用截圖位元組，不重新編碼
+        data = memoryview(source_bytes)
+        width, height = image.size
+    else:
+        width = min(spec["width"], image.width)
+        height = max(1, round(image.height * width / image.width))
+        resized = image
+        if width < image.width:
+            # 先以整數倍縮小，再以 Lanczos 縮到目標尺寸
+            factor = image.width // width
+            if factor > 1:
+                resized = resized.reduce(factor)
+            resized = resized.resize((width, height), Image.LANCZOS)
+        if fmt == "JPEG" and resized.mode != "RGB":
+            resized = resized.convert("RGB")
+
+        buffer = io.BytesIO()
+        if fmt == "PNG":
+            resized.save(buffer, fmt, optimize=False, compress_level=6)
+        else:
+            resized.save(buffer, fmt, quality=spec["quality"])
+        # 直接由緩衝區編碼，不另外複製一份位元組
+        data = buffer.getbuffer()
+
+    return {
+        "width": width,
+        "height": height,
+        "format": spec["format"],
+        "quality": spec["quality"] if fmt != "PNG" else None,
+        "size": data.nbytes,
+        "time_ms": round((time.time() - encode_start) * 1000, 2),
+        "data": base64.b64encode(data).decode("ascii"),
+    }
+
+
+def render_renditions(png_bytes, renditions):
+    """解碼截圖一次，依序產生各縮圖版本"""
+    decode_start = time.time()
+    image = Image.open(io.BytesIO(png_bytes))
+    image.load()
+    decode_time = time.time() - decode_start
+
+    results = []
+    for spec in renditions:
+        try:
+            results.append(_encode_rendition(image, spec, png_bytes))
+        except Exception as e:
+            results.append(dict(spec, error=str(e)))
+    return {
+        "renditions": results,
+        "renditions_decode_ms": round(decode_time * 1000, 2),
+    }
+
+
+def submit_renditions(png_bytes, renditions):
+    """在背景執行緒產生縮圖版本（Pillow 縮放與編碼時會釋放 GIL），立即回傳 Future"""
+    global _rendition_executor
+    if _rendition_executor is None:
+        # 模組層級的執行緒池，在同一個 Lambda 容器的多次呼叫之間保留
+        _rendition_executor = ThreadPoolExecutor(
+            max_workers=RENDITION_WORKERS, thread_name_prefix="rendition"
+        )
+    return _rendition_executor.submit(render_renditions, png_bytes, renditions)
+
+
+def collect_renditions(results, deadline=None):
+    """等待各結果中尚未完成的縮圖版本（不超過期限），並以實際內容取代 Future"""
+    for fields in results:
+        future = fields.get("renditions")
+        if not isinstance(future, Future):
+            continue
+        try:
+            timeout = deadline.remaining() if deadline else None
+            fields.update(future.result(timeout=timeout))
+        except FutureTimeoutError:
+            future.cancel()
+            fields["renditions"] = []
+            fields["renditions_error"] = "縮圖版本未在期限內完成"
+        except Exception as e:
+            fields["renditions"] = []
+            fields["renditions_error"] = str(e)
@@ -5,6 +5,8 @@ Page Loading Strategy Module
 """
 
 import time
+from deadline_handler import Deadline, PHASE_MIN_SECONDS
+from tracing_handler import traced
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
@@ -13,10 +15,12 @@ from selenium.webdriver.support import expected_conditions as EC
 class PageLoadingStrategy:
     """頁面載入策略處理器"""
 
-    def __init__(self, driver):
+    def __init__(self, driver, deadline=None):
         """初始化載入策略處理器"""
         self.driver = driver
+        self.deadline = deadline or Deadline()
 
+    @traced("page.loading")
     def execute_smart_loading(self, wait_for=None, wait_timeout=3):
         """執行頁面載入策略"""
         print("🎯 現代網站頁面載入策略...")
@@ -117,7 +121,7 @@ class PageLoadingStrategy:
         print("⏱️ 執行最小等待策略...")
         try:
             # 短暫等待內容出現
-            WebDriverWait(self.driver, 2).until(
+            WebDriverWait(self.driver, self.deadline.clamp(2)).until(
                 lambda d: len(d.find_element(By.TAG_NAME, "body").text.strip()) > 200
             )
             print("✅ 基本內容已載入")
@@ -125,13 +129,13 @@ class PageLoadingStrategy:
             print("⚠️ 最小等待完成，繼續處理")
 
         # 額外的資源等待時間
-        time.sleep(1)
+        self.deadline.sleep(1)
 
     def _wait_for_element(self, selector, timeout):
         """等待指定元素"""
         try:
             print(f"🎯 等待指定元素: {selector}")
-            WebDriverWait(self.driver, timeout).until(
+            WebDriverWait(self.driver, self.deadline.clamp(timeout)).until(
                 EC.presence_of_element_located((By.CSS_SELECTOR, selector))
             )
             print("✅ 指定元素已找到")
@@ -144,80 +148,90 @@ class PageLoadingStrategy:
 class ScreenshotHandler:
     """截圖處理器"""
 
-    def __init__(self, driver, font_handler):
+    # Chrome 單張截圖的最大紋理高度
+    MAX_CAPTURE_HEIGHT = 16384
+
+    def __init__(self, driver):
         """初始化截圖處理器"""
         self.driver = driver
-        self.font_handler = font_handler
-
-    def take_screenshot(self):
-        """執行截圖流程"""
-        try:
-            print("📸 準備截圖...")
-            screenshot_start = time.time()
-
-            # 應用截圖專用字體優化
-            self.font_handler.apply_screenshot_fonts(self.driver)
 
-            # 強制重新渲染
-            self.font_handler.force_rerender(self.driver)
-
-            # 等待字體載入和渲染
-            time.sleep(2)
-
-            # 滾動到頂部
-            self._scroll_to_top()
+    def capture_clip_base64(self, rect):
+        """以 DevTools 擷取指定區域並直接回傳 base64 內容，超出視窗高度的元素也無需調整視窗大小"""
+        clip = {
+            "x": max(0, rect["x"]),
+            "y": max(0, rect["y"]),
+            "width": max(1, rect["width"]),
+            "height": max(1, min(rect["height"], self.MAX_CAPTURE_HEIGHT)),
+            "scale": 1,
+        }
+        if rect["height"] > self.MAX_CAPTURE_HEIGHT:
+            print(f"⚠️ 元素高度超過上限，截取前 {self.MAX_CAPTURE_HEIGHT}px")
+        result = self.driver.execute_cdp_cmd(
+            "Page.captureScreenshot",
+            {"format": "png", "clip": clip, "captureBeyondViewport": True},
+        )
+        return result["data"], clip
 
-            # 執行截圖
-            print("📷 開始截圖...")
-            screenshot_bytes = self.driver.get_screenshot_as_png()
 
-            if screenshot_bytes and len(screenshot_bytes) > 0:
-                screenshot_time = time.time() - screenshot_start
-                print(
-                    f"✅ 截圖完成！(大小: {len(screenshot_bytes)} bytes, 耗時: {screenshot_time:.2f}s)"
-                )
-                return {
-                    "success": True,
-                    "data": screenshot_bytes,
-                    "size": len(screenshot_bytes),
-                    "time": screenshot_time,
-                }
-            else:
-                raise Exception("截圖數據為空")
+class ViewportRenderer:
+    """多視窗尺寸渲染器：在同一次導航中切換裝置尺寸模擬"""
 
-        except Exception as e:
-            print(f"❌ 截圖錯誤: {str(e)}")
-            return self._fallback_screenshot(str(e))
+    def __init__(self, driver, loading_strategy, deadline=None):
+        """初始化多視窗渲染器"""
+        self.driver = driver
+        self.loading_strategy = loading_strategy
+        self.deadline = deadline or Deadline()
+
+    def apply(self, viewport):
+        """透過 DevTools 套用裝置尺寸，不重新啟動瀏覽器或調整視窗"""
+        self.driver.execute_cdp_cmd(
+            "Emulation.setDeviceMetricsOverride",
+            {
+                "width": int(viewport["width"]),
+                "height": int(viewport["height"]),
+                "deviceScaleFactor": viewport.get("device_scale_factor", 1),
+                "mobile": bool(viewport.get("mobile", False)),
+            },
+        )
 
-    def _scroll_to_top(self):
-        """滾動到頁面頂部"""
+    def reset(self):
+        """清除裝置尺寸模擬"""
         try:
-            self.driver.execute_script("window.scrollTo(0, 0);")
-            print("✅ 頁面已滾動到頂部")
-        except Exception:
-            print("⚠️ 無法滾動頁面")
+            self.driver.execute_cdp_cmd("Emulation.clearDeviceMetricsOverride", {})
+        except Exception as e:
+            print(f"⚠️ 無法清除裝置尺寸模擬: {e}")
 
-    def _fallback_screenshot(self, error_msg):
-        """備用截圖方法"""
-        fallback_error = None
+    def render_all(
+        self, viewports, capture, wait_for=None, min_time=PHASE_MIN_SECONDS["viewport"]
+    ):
+        """依序套用各尺寸、重新執行就緒檢查並截圖"""
+        results = []
         try:
-            print("🔄 嘗試備用截圖方法...")
-            screenshot_bytes = self.driver.get_screenshot_as_png()
-            if screenshot_bytes:
-                print("✅ 備用截圖成功！")
-                return {
-                    "success": True,
-                    "data": screenshot_bytes,
-                    "size": len(screenshot_bytes),
-                    "fallback": True,
-                    "original_error": error_msg,
+            for viewport in viewports:
+                name = viewport.get("name", f"{viewport['width']}x{viewport['height']}")
+                # 時間不足時保留已完成的結果，其餘標記為略過
+                if not self.deadline.has_time(min_time):
+                    self.deadline.skip(f"viewport:{name}")
+                    continue
+                print(f"📐 切換視窗尺寸: {name}")
+                render_start = time.time()
+                result = {
+                    "name": name,
+                    "width": viewport["width"],
+                    "height": viewport["height"],
                 }
-        except Exception as e:
-            fallback_error = e
-            print(f"❌ 備用截圖也失敗: {fallback_error}")
-
-        return {
-            "success": False,
-            "error": error_msg,
-            "fallback_error": str(fallback_error) if fallback_error else None,
-        }
+                try:
+                    self.apply(viewport)
+                    # 只重跑就緒檢查，不重新導航
+                    result["loading"] = self.loading_strategy.execute_smart_loading(
+                        wait_for=wait_for
+                    )
+                    result.update(capture(viewport))
+                except Exception as e:
+                    print(f"❌ 視窗 {name} 渲染失敗: {e}")
+                    result["error"] = str(e)
+                result["time"] = round(time.time() - render_start, 3)
+                results.append(result)
+        finally:
+            self.reset()
+        return results
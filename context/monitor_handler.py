@@ -0,0 +1,221 @@
+"""
+變更偵測模組
+Change Detection Module
+此模組負責計算頁面內容指紋並與上一次的結果比較，供輪詢監控使用
+"""
+
+import difflib
+import itertools
+import re
+import time
+from storage_handler import create_store
+
+# unified diff 的區塊標頭，例如 @@ -3,0 +4,2 @@
+HUNK_HEADER = re.compile(r"^@@ .* @@")
+
+# 在頁面內完成正規化、指紋與 MinHash 計算，只回傳精簡結果
+FINGERPRINT_SCRIPT = """
+const selector = arguments[0];
+const opts = arguments[1] || {};
+
+let el = null;
+try {
+    if (selector.startsWith('//')) {
+        el = document.evaluate(
+            selector, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null
+        ).singleNodeValue;
+    } else {
+        el = document.querySelector(selector);
+    }
+} catch (e) {
+    el = null;
+}
+const found = !!el;
+el = el || document.body;
+
+let text = el ? (el.innerText || el.textContent || '') : '';
+text = text.normalize('NFKC');
+for (const pattern of (opts.ignorePatterns || [])) {
+    try {
+        text = text.replace(new RegExp(pattern, 'g'), '');
+    } catch (e) {}
+}
+const lines = text.split('\\n').map(l => l.replace(/\\s+/g, ' ').trim()).filter(l => l);
+const normalized = lines.join('\\n');
+// 保留在頁面中，只有內容變更時才取回
+window.__monitorLines = lines;
+
+const fmix = (h) => {
+    h ^= h >>> 16;
+    h = Math.imul(h, 0x85ebca6b);
+    h ^= h >>> 13;
+    h = Math.imul(h, 0xc2b2ae35);
+    h ^= h >>> 16;
+    return h >>> 0;
+};
+const hex = (h) => h.toString(16).padStart(8, '0');
+
+// 64-bit 指紋（兩組 32-bit 雜湊）
+let h1 = 0x811c9dc5;
+let h2 = 0x9747b28c ^ normalized.length;
+for (let i = 0; i < normalized.length; i++) {
+    const c = normalized.charCodeAt(i);
+    h1 = Math.imul(h1 ^ c, 0x01000193);
+    h2 = Math.imul(h2 ^ c, 0x5bd1e995);
+}
+const fingerprint = hex(fmix(h1)) + hex(fmix(h2));
+
+// 字元 k-gram 分片（滾動雜湊），對中文等無空白語言同樣有效
+const compact = normalized.replace(/\\s+/g, '').toLowerCase();
+const k = Math.max(1, opts.shingleSize || 5);
+const base = 0x01000193;
+let basePow = 1;
+for (let i = 0; i < k - 1; i++) basePow = Math.imul(basePow, base);
+
+const shingles = new Set();
+if (compact.length > 0 && compact.length < k) {
+    let h = 0;
+    for (let i = 0; i < compact.length; i++) h = (Math.imul(h, base) + compact.charCodeAt(i)) | 0;
+    shingles.add(h);
+} else if (compact.length >= k) {
+    let h = 0;
+    for (let i = 0; i < k; i++) h = (Math.imul(h, base) + compact.charCodeAt(i)) | 0;
+    shingles.add(h);
+    for (let i = k; i < compact.length; i++) {
+        h = (h - Math.imul(compact.charCodeAt(i - k), basePow)) | 0;
+        h = (Math.imul(h, base) + compact.charCodeAt(i)) | 0;
+        shingles.add(h);
+    }
+}
+
+const numHashes = opts.numHashes || 64;
+const seeds = [];
+for (let j = 0; j < numHashes; j++) seeds.push(fmix(Math.imul(j + 1, 0x9e3779b9)));
+const signature = new Array(numHashes).fill(0xffffffff);
+for (const s of shingles) {
+    for (let j = 0; j < numHashes; j++) {
+        const v = fmix(s ^ seeds[j]);
+        if (v < signature[j]) signature[j] = v;
+    }
+}
+
+return {
+    found: found,
+    fingerprint: fingerprint,
+    signature: signature,
+    shingleCount: shingles.size,
+    textLength: normalized.length
+};
+"""
+
+
+class ChangeMonitor:
+    """內容變更監控器"""
+
+    def __init__(self, driver, store=None):
+        """初始化變更監控器"""
+        self.driver = driver
+        self.store = store or create_store("monitor")
+
+    def check(self, url, selector="html", options=None):
+        """計算目前指紋並與儲存的上一次結果比較"""
+        options = options or {}
+        shingle_size = options.get("shingle_size", 5)
+        num_hashes = options.get("num_hashes", 64)
+        max_diff_lines = options.get("max_diff_lines", 50)
+        max_stored_chars = options.get("max_stored_chars", 200000)
+
+        print("🔍 計算內容指紋...")
+        check_start = time.time()
+        current = self.driver.execute_script(
+            FINGERPRINT_SCRIPT,
+            selector,
+            {
+                "ignorePatterns": options.get("ignore_patterns", []),
+                "shingleSize": shingle_size,
+                "numHashes": num_hashes,
+            },
+        )
+
+        key = f"{url}|{selector}"
+        previous = self.store.get(key)
+        params = [shingle_size, num_hashes]
+        comparable = bool(previous) and previous.get("params") == params
+
+        result = {
+            "fingerprint": current["fingerprint"],
+            "selector_found": current["found"],
+            "first_check": previous is None,
+        }
+
+        if comparable and previous.get("fingerprint") == current["fingerprint"]:
+            result["changed"] = False
+            result["similarity"] = 1.0
+            print(f"✅ 內容未變更 ({time.time() - check_start:.2f}s)")
+            return result
+
+        # 內容有變更（或第一次檢查），才把正規化後的文字取回
+        lines = self.driver.execute_script("return window.__monitorLines || [];") or []
+        result["changed"] = True
+        if comparable:
+            result["similarity"] = self._similarity(
+                previous.get("signature", []), current["signature"]
+            )
+            result["diff"], result["diff_truncated"] = self._compact_diff(
+                previous.get("lines", []), lines, max_diff_lines
+            )
+        else:
+            result["similarity"] = 0.0
+
+        self.store.put(
+            key,
+            {
+                "fingerprint": current["fingerprint"],
+                "signature": current["signature"],
+                "params": params,
+                "lines": self._cap_lines(lines, max_stored_chars),
+                "updated_at": int(time.time()),
+            },
+        )
+        print(
+            f"🆕 內容已變更 (相似度: {result['similarity']:.3f}, 耗時: {time.time() - check_start:.2f}s)"
+        )
+        return result
+
+    @staticmethod
+    def _similarity(previous_signature, current_signature):
+        """以 MinHash 簽章估算 Jaccard 相似度"""
+        if not previous_signature or len(previous_signature) != len(current_signature):
+            return 0.0
+        matches = sum(
+            1 for a, b in zip(previous_signature, current_signature) if a == b
+        )
+        return round(matches / len(current_signature), 4)
+
+    @staticmethod
+    def _compact_diff(previous_lines, current_lines, max_lines):
+        """產生不含上下文的精簡差異"""
+        # 前兩行為檔案標頭（---/+++），依位置略過；內容行可能以 -- 或 ++ 開頭
+        diff_lines = [
+            line
+            for line in itertools.islice(
+                difflib.unified_diff(previous_lines, current_lines, lineterm="", n=0),
+                2,
+                None,
+            )
+            if not HUNK_HEADER.match(line)
+        ]
+        truncated = len(diff_lines) > max_lines
+        return "\n".join(diff_lines[:max_lines]), truncated
+
+    @staticmethod
+    def _cap_lines(lines, max_chars):
+        """限制儲存的文字量"""
+        capped = []
+        total = 0
+        for line in lines:
+            total += len(line) + 1
+            if total > max_chars:
+                break
+            capped.append(line)
+        return capped
@@ -0,0 +1,174 @@
+"""
+網路追蹤模組
+Network Tracing Module
+此模組由 DevTools 網路事件整理請求瀑布圖摘要，並收集 Chrome 效能指標
+"""
+
+import json
+
+# 回傳的 Chrome 效能指標
+PERFORMANCE_METRICS = (
+    "LayoutCount",
+    "RecalcStyleCount",
+    "LayoutDuration",
+    "RecalcStyleDuration",
+    "ScriptDuration",
+    "TaskDuration",
+    "JSHeapUsedSize",
+    "JSHeapTotalSize",
+    "Nodes",
+    "Documents",
+)
+
+
+def enable_performance_log(options):
+    """在 Chrome 選項中啟用效能日誌（只在需要追蹤時呼叫，未啟用時沒有額外成本）"""
+    options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    options.add_experimental_option(
+        "perfLoggingPrefs", {"enableNetwork": True, "enablePage": False}
+    )
+
+
+def _phase(end, start):
+    """計算時間區段（毫秒），不適用時回傳 None"""
+    if start is None or end is None or start < 0 or end < 0:
+        return None
+    return round(end - start, 2)
+
+
+class NetworkRecorder:
+    """網路請求記錄器"""
+
+    def __init__(self, driver):
+        """初始化網路請求記錄器"""
+        self.driver = driver
+        self.requests = {}
+
+    def enable(self):
+        """啟用效能指標收集"""
+        try:
+            self.driver.execute_cdp_cmd("Performance.enable", {})
+        except Exception as e:
+            print(f"⚠️ 無法啟用效能指標: {e}")
+
+    def drain(self):
+        """讀取並解析目前累積的網路事件"""
+        try:
+            entries = self.driver.get_log("performance")
+        except Exception as e:
+            print(f"⚠️ 無法讀取效能日誌: {e}")
+            return
+
+        for entry in entries:
+            try:
+                message = json.loads(entry["message"])["message"]
+            except (KeyError, ValueError):
+                continue
+            self._handle_event(message.get("method", ""), message.get("params", {}))
+
+    def _handle_event(self, method, params):
+        """依事件類型更新請求紀錄"""
+        request_id = params.get("requestId")
+        if not request_id or not method.startswith("Network."):
+            return
+
+        record = self.requests.setdefault(request_id, {"request_id": request_id})
+        if method == "Network.requestWillBeSent":
+            if "url" in record and params.get("redirectResponse"):
+                # 轉址沿用同一個 requestId，只記錄最後一跳
+                record["redirects"] = record.get("redirects", 0) + 1
+            record["url"] = params["request"]["url"]
+            record["method"] = params["request"].get("method")
+            record["type"] = params.get("type", "Other")
+            record.setdefault("start", params.get("timestamp"))
+        elif method == "Network.responseReceived":
+            response = params.get("response", {})
+            record["status"] = response.get("status")
+            record["mime_type"] = response.get("mimeType")
+            record["type"] = params.get("type", record.get("type"))
+            record["from_cache"] = bool(
+                response.get("fromDiskCache") or response.get("fromPrefetchCache")
+            )
+            record["timing"] = response.get("timing")
+        elif method == "Network.loadingFinished":
+            record["end"] = params.get("timestamp")
+            record["bytes"] = int(params.get("encodedDataLength", 0))
+        elif method == "Network.loadingFailed":
+            record["end"] = params.get("timestamp")
+            record["error"] = params.get("errorText")
+
+    @staticmethod
+    def _entry(record):
+        """轉換為精簡的 HAR 類紀錄"""
+        entry = {
+            "url": record.get("url"),
+            "type": record.get("type"),
+            "status": record.get("status"),
+            "bytes": record.get("bytes", 0),
+        }
+        if record.get("start") is not None and record.get("end") is not None:
+            entry["time_ms"] = round((record["end"] - record["start"]) * 1000, 2)
+
+        timing = record.get("timing")
+        if timing:
+            headers_end = timing.get("receiveHeadersEnd")
+            entry["timings"] = {
+                "dns": _phase(timing.get("dnsEnd"), timing.get("dnsStart")),
+                "connect": _phase(timing.get("connectEnd"), timing.get("connectStart")),
+                "ssl": _phase(timing.get("sslEnd"), timing.get("sslStart")),
+                "send": _phase(timing.get("sendEnd"), timing.get("sendStart")),
+                "wait": _phase(headers_end, timing.get("sendEnd")),
+                "receive": (
+                    _phase((record["end"] - timing["requestTime"]) * 1000, headers_end)
+                    if record.get("end") is not None and timing.get("requestTime")
+                    else None
+                ),
+            }
+        if record.get("from_cache"):
+            entry["from_cache"] = True
+        if record.get("error"):
+            entry["error"] = record["error"]
+        if record.get("redirects"):
+            entry["redirects"] = record["redirects"]
+        return entry
+
+    def summary(self, top_n=10):
+        """產生網路請求摘要：依類型統計、最慢與最大的前 N 筆、失敗請求"""
+        self.drain()
+        entries = [self._entry(r) for r in self.requests.values() if r.get("url")]
+
+        by_type = {}
+        for entry in entries:
+            stats = by_type.setdefault(
+                entry["type"] or "Other", {"count": 0, "bytes": 0}
+            )
+            stats["count"] += 1
+            stats["bytes"] += entry["bytes"]
+
+        return {
+            "request_count": len(entries),
+            "total_bytes": sum(entry["bytes"] for entry in entries),
+            "by_type": by_type,
+            "slowest": sorted(
+                (e for e in entries if "time_ms" in e),
+                key=lambda e: e["time_ms"],
+                reverse=True,
+            )[:top_n],
+            "largest": sorted(entries, key=lambda e: e["bytes"], reverse=True)[:top_n],
+            "failed": [
+                e for e in entries if e.get("error") or (e.get("status") or 0) >= 400
+            ][:top_n],
+        }
+
+    def performance_metrics(self):
+        """讀取 Chrome 效能指標（版面配置次數、腳本時間、JS 記憶體等）"""
+        try:
+            metrics = self.driver.execute_cdp_cmd("Performance.getMetrics", {})
+        except Exception as e:
+            print(f"⚠️ 無法讀取效能指標: {e}")
+            return {}
+        return {
+            metric["name"]: metric["value"]
+            for metric in metrics.get("metrics", [])
+            if metric["name"] in PERFORMANCE_METRICS
+        }
@@ -0,0 +1,108 @@
+"""
+PDF 輸出模組
+PDF Output Module
+此模組透過 DevTools 列印 API 以串流方式產生 PDF，分段寫入暫存檔再交給成品輸出
+"""
+
+import base64
+import os
+import tempfile
+import time
+import uuid
+from storage_handler import create_artifact_sink
+from tracing_handler import traced
+
+# 常用紙張尺寸（英吋）
+PAPER_SIZES = {
+    "a3": (11.69, 16.54),
+    "a4": (8.27, 11.69),
+    "a5": (5.83, 8.27),
+    "letter": (8.5, 11.0),
+    "legal": (8.5, 14.0),
+}
+
+
+class PdfGenerator:
+    """PDF 產生器"""
+
+    def __init__(self, driver, sink=None, chunk_size=1024 * 1024):
+        """初始化 PDF 產生器"""
+        self.driver = driver
+        self.sink = sink or create_artifact_sink()
+        self.chunk_size = chunk_size
+
+    def build_print_params(self, options=None):
+        """將請求參數轉換為 Page.printToPDF 參數"""
+        options = options or {}
+        width, height = PAPER_SIZES.get(
+            str(options.get("format", "a4")).lower(), PAPER_SIZES["a4"]
+        )
+        params = {
+            "transferMode": "ReturnAsStream",
+            "landscape": bool(options.get("landscape", False)),
+            "printBackground": bool(options.get("print_background", True)),
+            "scale": options.get("scale", 1),
+            "paperWidth": options.get("paper_width", width),
+            "paperHeight": options.get("paper_height", height),
+            "marginTop": options.get("margin_top", 0.4),
+            "marginBottom": options.get("margin_bottom", 0.4),
+            "marginLeft": options.get("margin_left", 0.4),
+            "marginRight": options.get("margin_right", 0.4),
+            "preferCSSPageSize": bool(options.get("prefer_css_page_size", False)),
+        }
+        if options.get("page_ranges"):
+            params["pageRanges"] = options["page_ranges"]
+
+        header = options.get("header_template")
+        footer = options.get("footer_template")
+        if header or footer:
+            params["displayHeaderFooter"] = True
+            # 未提供的一側以空白元素取代 Chrome 預設的頁首頁尾
+            params["headerTemplate"] = header or "<span></span>"
+            params["footerTemplate"] = footer or "<span></span>"
+        return params
+
+    @traced("pdf")
+    def generate(self, options=None):
+        """產生 PDF，以 IO.read 分段讀取串流並寫入成品輸出"""
+        print("🖨️ 開始產生 PDF...")
+        pdf_start = time.time()
+
+        result = self.driver.execute_cdp_cmd(
+            "Page.printToPDF", self.build_print_params(options)
+        )
+        stream = result["stream"]
+
+        fd, temp_path = tempfile.mkstemp(suffix=".pdf")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                while True:
+                    chunk = self.driver.execute_cdp_cmd(
+                        "IO.read", {"handle": stream, "size": self.chunk_size}
+                    )
+                    data = chunk.get("data", "")
+                    if data:
+                        if chunk.get("base64Encoded"):
+                            f.write(base64.b64decode(data))
+                        else:
+                            f.write(data.encode("utf-8"))
+                    if chunk.get("eof"):
+                        break
+        except Exception:
+            os.remove(temp_path)
+            raise
+        finally:
+            try:
+                self.driver.execute_cdp_cmd("IO.close", {"handle": stream})
+            except Exception as close_error:
+                print(f"⚠️ 無法關閉 PDF 串流: {close_error}")
+
+        name = f"pdf/{int(time.time())}-{uuid.uuid4().hex[:8]}.pdf"
+        artifact = self.sink.save_file(temp_path, name, "application/pdf")
+        pdf_time = time.time() - pdf_start
+        print(f"✅ PDF 完成！(大小: {artifact['size']} bytes, 耗時: {pdf_time:.2f}s)")
+        return {
+            "artifact": artifact,
+            "size": artifact["size"],
+            "time": round(pdf_time, 3),
+        }
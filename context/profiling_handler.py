@@ -0,0 +1,253 @@
+"""
+慢請求分析模組
+Slow Request Profiling Module
+此模組在指定或隨機抽樣的請求中同時錄製 Chrome 效能追蹤與 Python 取樣分析，只在請求超過門檻時保存成品
+"""
+
+import base64
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from browser_handler import DevToolsSocket
+from storage_handler import create_artifact_sink
+
+# 隨機抽樣比例與保存門檻（毫秒）
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_THRESHOLD_MS = int(os.environ.get("PROFILE_THRESHOLD_MS", "10000"))
+
+SAMPLE_INTERVAL = 0.01
+HOT_SPOT_COUNT = 10
+
+# 與 DevTools 效能面板相同的主要追蹤類別
+TRACE_CATEGORIES = [
+    "devtools.timeline",
+    "disabled-by-default-devtools.timeline",
+    "disabled-by-default-devtools.timeline.frame",
+    "toplevel",
+    "blink.user_timing",
+    "loading",
+    "latencyInfo",
+    "v8.execute",
+    "disabled-by-default-v8.cpu_profiler",
+]
+
+
+class StackSampler:
+    """Python 取樣分析器：背景執行緒定期讀取目標執行緒的呼叫堆疊"""
+
+    def __init__(self, interval=SAMPLE_INTERVAL, thread_id=None):
+        """初始化取樣分析器（預設取樣呼叫端執行緒）"""
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """開始取樣"""
+        self._thread = threading.Thread(
+            target=self._run, name="stack-sampler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """停止取樣"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        """取樣迴圈：只記錄堆疊，統計在停止後才計算"""
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_filename, code.co_name, frame.f_lineno))
+                frame = frame.f_back
+            if stack:
+                self.stacks[tuple(reversed(stack))] += 1
+                self.samples += 1
+
+    @staticmethod
+    def _label(frame):
+        """堆疊框架的顯示名稱"""
+        filename, name, line = frame
+        return f"{name} ({os.path.basename(filename)}:{line})"
+
+    def folded(self):
+        """輸出 flame graph 使用的 folded stack 格式"""
+        return "\n".join(
+            f"{';'.join(self._label(frame) for frame in stack)} {count}"
+            for stack, count in self.stacks.most_common()
+        )
+
+    def hot_spots(self, top_n=HOT_SPOT_COUNT):
+        """依自身時間與累計時間排序的熱點函式"""
+        self_counts = Counter()
+        total_counts = Counter()
+        for stack, count in self.stacks.items():
+            self_counts[self._label(stack[-1])] += count
+            for function in {(filename, name) for filename, name, _ in stack}:
+                total_counts[function] += count
+
+        def percent(count):
+            return round(100 * count / self.samples, 1) if self.samples else 0.0
+
+        return {
+            "self": [
+                {"frame": label, "samples": count, "percent": percent(count)}
+                for label, count in self_counts.most_common(top_n)
+            ],
+            "total": [
+                {
+                    "function": f"{name} ({os.path.basename(filename)})",
+                    "samples": count,
+                    "percent": percent(count),
+                }
+                for (filename, name), count in total_counts.most_common(top_n)
+            ],
+        }
+
+
+class ChromeTracer:
+    """Chrome 效能追蹤：透過瀏覽器的遠端除錯埠直接使用 DevTools Tracing"""
+
+    def __init__(self, port, timeout=10):
+        """初始化 Chrome 追蹤"""
+        self.port = port
+        self.timeout = timeout
+        self.devtools = None
+
+    def start(self, categories=None):
+        """連線到瀏覽器並開始追蹤（以串流回傳）"""
+        self.devtools = DevToolsSocket.browser(self.port, self.timeout)
+        self.devtools.call(
+            "Tracing.start",
+            {
+                "transferMode": "ReturnAsStream",
+                "traceConfig": {
+                    "includedCategories": categories or TRACE_CATEGORIES,
+                    "recordMode": "recordAsMuchAsPossible",
+                },
+            },
+        )
+
+    def stop(self, path=None):
+        """停止追蹤；指定 path 時將追蹤串流寫入檔案，否則直接捨棄"""
+        devtools = self.devtools
+        try:
+            devtools.send("Tracing.end")
+            stream = devtools.wait(
+                lambda m: m.get("method") == "Tracing.tracingComplete"
+            )["params"].get("stream")
+            if stream and path:
+                with open(path, "wb") as f:
+                    while True:
+                        chunk = devtools.call("IO.read", {"handle": stream})
+                        data = chunk.get("data", "")
+                        if data:
+                            f.write(
+                                base64.b64decode(data)
+                                if chunk.get("base64Encoded")
+                                else data.encode("utf-8")
+                            )
+                        if chunk.get("eof"):
+                            break
+            if stream:
+                devtools.call("IO.close", {"handle": stream})
+        finally:
+            devtools.close()
+            self.devtools = None
+
+
+class RequestProfiler:
+    """慢請求分析：請求開始時錄製，結束時依耗時決定是否保存"""
+
+    def __init__(self, reason, threshold_ms, sink=None):
+        """初始化請求分析"""
+        self.reason = reason
+        self.threshold_ms = threshold_ms
+        self.sink = sink
+        self.sampler = StackSampler()
+        self.chrome = None
+        self.chrome_error = None
+        self.start_time = None
+        self.summary = None
+
+    @classmethod
+    def from_payload(cls, option):
+        """依請求參數或隨機抽樣建立分析器，未啟用時回傳 None"""
+        if option:
+            options = option if isinstance(option, dict) else {}
+            # 明確要求時預設一律保存
+            return cls("request", options.get("threshold_ms", 0))
+        if PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE:
+            return cls("sampled", PROFILE_THRESHOLD_MS)
+        return None
+
+    def start(self):
+        """開始 Python 取樣"""
+        print(f"🔬 開始效能分析 ({self.reason}, 門檻: {self.threshold_ms}ms)")
+        self.start_time = time.time()
+        self.sampler.start()
+
+    def attach_browser(self, port):
+        """開始錄製 Chrome 追蹤，失敗時只保留 Python 分析"""
+        try:
+            chrome = ChromeTracer(port)
+            chrome.start()
+            self.chrome = chrome
+        except Exception as e:
+            print(f"⚠️ 無法錄製 Chrome 追蹤: {e}")
+            self.chrome_error = str(e)
+
+    def finish(self):
+        """停止錄製；超過門檻時將成品寫入成品輸出並回傳摘要（可重複呼叫）"""
+        if self.summary is not None or self.start_time is None:
+            return self.summary
+        self.sampler.stop()
+        duration_ms = int((time.time() - self.start_time) * 1000)
+        keep = duration_ms >= self.threshold_ms
+        self.summary = {
+            "reason": self.reason,
+            "duration_ms": duration_ms,
+            "threshold_ms": self.threshold_ms,
+            "kept": keep,
+        }
+        if self.chrome_error:
+            self.summary["chrome_trace_error"] = self.chrome_error
+        prefix = f"profiles/{int(time.time())}-{uuid.uuid4().hex[:8]}"
+        sink = (self.sink or create_artifact_sink()) if keep else None
+
+        if self.chrome:
+            try:
+                fd, trace_path = tempfile.mkstemp(suffix=".json")
+                os.close(fd)
+                self.chrome.stop(trace_path if keep else None)
+                if keep:
+                    self.summary["chrome_trace"] = sink.save_file(
+                        trace_path, f"{prefix}/chrome-trace.json", "application/json"
+                    )
+                else:
+                    os.remove(trace_path)
+            except Exception as e:
+                print(f"⚠️ Chrome 追蹤保存失敗: {e}")
+                self.summary["chrome_trace_error"] = str(e)
+
+        if keep:
+            self.summary["samples"] = self.sampler.samples
+            self.summary["hot_spots"] = self.sampler.hot_spots()
+            self.summary["python_profile"] = sink.save_bytes(
+                self.sampler.folded().encode("utf-8"),
+                f"{prefix}/python.folded",
+                "text/plain",
+            )
+            print(f"🔬 效能分析已保存 ({duration_ms}ms, {self.sampler.samples} 個樣本)")
+        return self.summary
@@ -0,0 +1,259 @@
+"""
+重試與斷路器模組
+Retry and Circuit Breaker Module
+此模組依失敗類型重試頁面導航（沿用同一個瀏覽器），並對持續失敗的網域快速失敗
+"""
+
+import random
+import time
+from urllib.parse import urlparse
+from deadline_handler import Deadline
+from storage_handler import create_store
+
+FAILURE_DNS = "dns"
+FAILURE_TIMEOUT = "timeout"
+FAILURE_RESET = "reset"
+FAILURE_HTTP_5XX = "http_5xx"
+FAILURE_OTHER = "other"
+
+# Chrome 網路錯誤代碼與失敗類型的對應
+ERROR_PATTERNS = {
+    FAILURE_DNS: ("ERR_NAME_NOT_RESOLVED", "ERR_NAME_RESOLUTION_FAILED"),
+    FAILURE_TIMEOUT: (
+        "ERR_TIMED_OUT",
+        "ERR_CONNECTION_TIMED_OUT",
+        "TimeoutException",
+        "Timed out",
+    ),
+    FAILURE_RESET: (
+        "ERR_CONNECTION_RESET",
+        "ERR_CONNECTION_CLOSED",
+        "ERR_CONNECTION_REFUSED",
+        "ERR_EMPTY_RESPONSE",
+        "ERR_SSL_PROTOCOL_ERROR",
+    ),
+}
+
+# 各失敗類型的最多嘗試次數（含第一次）
+DEFAULT_MAX_ATTEMPTS = {
+    FAILURE_DNS: 2,
+    FAILURE_TIMEOUT: 2,
+    FAILURE_RESET: 3,
+    FAILURE_HTTP_5XX: 3,
+    FAILURE_OTHER: 1,
+}
+
+# 導航後讀取主文件 HTTP 狀態碼
+RESPONSE_STATUS_SCRIPT = """
+const nav = performance.getEntriesByType('navigation')[0];
+return nav && nav.responseStatus ? nav.responseStatus : null;
+"""
+
+
+class CircuitOpenError(Exception):
+    """網域斷路器開啟中"""
+
+    status_code = 503
+
+    def __init__(self, domain, retry_after):
+        """初始化斷路器錯誤"""
+        super().__init__(f"網域 {domain} 暫時停止請求（{retry_after:.0f}s 後重試）")
+        self.domain = domain
+        self.retry_after = retry_after
+
+
+class NavigationError(Exception):
+    """導航重試後仍然失敗"""
+
+    status_code = 502
+
+    def __init__(self, message, failure, attempts=None):
+        """初始化導航錯誤"""
+        super().__init__(message)
+        self.failure = failure
+        self.attempts = attempts or []
+
+
+def classify_failure(error=None, status=None):
+    """依例外訊息或 HTTP 狀態碼判斷失敗類型"""
+    if error is not None:
+        message = f"{type(error).__name__}: {error}"
+        for failure, patterns in ERROR_PATTERNS.items():
+            if any(pattern in message for pattern in patterns):
+                return failure
+        return FAILURE_OTHER
+    if status is not None and 500 <= status < 600:
+        return FAILURE_HTTP_5XX
+    return None
+
+
+class RetryPolicy:
+    """重試策略：依失敗類型決定次數，指數退避並加入隨機抖動"""
+
+    def __init__(self, max_attempts=None, base_delay=0.5, max_delay=4.0):
+        """初始化重試策略"""
+        self.max_attempts = dict(DEFAULT_MAX_ATTEMPTS)
+        self.max_attempts.update(max_attempts or {})
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    @classmethod
+    def from_options(cls, options=None):
+        """由請求參數建立重試策略"""
+        options = options or {}
+        max_attempts = options.get("max_attempts")
+        if isinstance(max_attempts, int):
+            # 單一數字時套用到所有可重試的類型
+            max_attempts = {
+                failure: max_attempts
+                for failure in DEFAULT_MAX_ATTEMPTS
+                if failure != FAILURE_OTHER
+            }
+        return cls(
+            max_attempts=max_attempts,
+            base_delay=options.get("base_delay", 0.5),
+            max_delay=options.get("max_delay", 4.0),
+        )
+
+    def should_retry(self, failure, attempt):
+        """第 attempt 次嘗試失敗後是否還能重試"""
+        return attempt < self.max_attempts.get(failure, 1)
+
+    def delay(self, attempt):
+        """計算退避時間（full jitter）"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2**attempt)))
+
+
+class CircuitBreaker:
+    """網域斷路器：連續失敗達門檻後，在冷卻期間內直接拒絕請求"""
+
+    def __init__(self, store=None, failure_threshold=5, cooldown=60):
+        """初始化斷路器"""
+        self.store = store or create_store("circuits")
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+
+    @staticmethod
+    def domain_of(url):
+        """取得網址的網域"""
+        return (urlparse(url).hostname or "").lower()
+
+    def check(self, domain):
+        """斷路器開啟中時拋出 CircuitOpenError（冷卻後放行一次試探請求）"""
+        state = self.store.get(domain) or {}
+        open_until = state.get("open_until") or 0
+        if open_until > time.time():
+            raise CircuitOpenError(domain, open_until - time.time())
+
+    def record_success(self, domain):
+        """導航成功，重置失敗計數"""
+        if self.store.get(domain):
+            self.store.delete(domain)
+
+    def record_failure(self, domain):
+        """導航失敗，達門檻時開啟斷路器"""
+        state = self.store.get(domain) or {"failures": 0}
+        state["failures"] = state.get("failures", 0) + 1
+        if state["failures"] >= self.failure_threshold:
+            state["open_until"] = time.time() + self.cooldown
+            print(f"🚧 網域 {domain} 連續失敗 {state['failures']} 次，斷路 {self.cooldown}s")
+        self.store.put(domain, state, ttl=self.cooldown * 10)
+
+
+def navigate_with_retry(
+    driver,
+    url,
+    policy=None,
+    breaker=None,
+    deadline=None,
+    watcher=None,
+    page_load_timeout=None,
+):
+    """
+    導航到網址，依失敗類型重試；重試沿用同一個瀏覽器（watcher 為主文件監看器，提供狀態碼與內容類型）
+    每次嘗試前都依剩餘期限重新設定頁面載入逾時，重試放不下退避時間加逾時時略過；
+    逾時受期限縮短時不計入斷路器（網域未必有問題）
+    """
+    policy = policy or RetryPolicy()
+    deadline = deadline or Deadline()
+    domain = CircuitBreaker.domain_of(url)
+    attempts = []
+    failure = None
+
+    attempt = 0
+    while True:
+        attempt += 1
+        attempt_start = time.time()
+        error = None
+        status = None
+        document = None
+        clamped = False
+        try:
+            if page_load_timeout is not None:
+                limit = deadline.clamp(page_load_timeout, minimum=1)
+                clamped = limit < page_load_timeout
+                driver.set_page_load_timeout(limit)
+            if watcher:
+                watcher.reset()
+            driver.get(url)
+            document = watcher.result() if watcher else None
+            if document and document.get("status") is not None:
+                status = document["status"]
+            else:
+                try:
+                    status = driver.execute_script(RESPONSE_STATUS_SCRIPT)
+                except Exception:
+                    status = None
+        except Exception as e:
+            error = e
+
+        failure = classify_failure(error, status)
+        attempts.append(
+            {
+                "attempt": attempt,
+                "time": round(time.time() - attempt_start, 3),
+                "status": status,
+                "failure": failure,
+                "error": str(error)[:200] if error else None,
+                "timeout_clamped": clamped,
+            }
+        )
+
+        if failure is None:
+            print(f"✅ 頁面導航完成 (第 {attempt} 次, {attempts[-1]['time']:.2f}s)")
+            break
+
+        print(
+            f"⚠️ 頁面導航發生問題 (第 {attempt} 次, 類型: {failure}): {str(error or status)[:80]}"
+        )
+        if not policy.should_retry(failure, attempt):
+            break
+        backoff = policy.delay(attempt)
+        attempt_timeout = (
+            deadline.clamp(page_load_timeout, minimum=1)
+            if page_load_timeout is not None
+            else 1
+        )
+        if not deadline.has_time(backoff + attempt_timeout):
+            deadline.skip("navigation_retry")
+            break
+        print(f"🔁 {backoff:.2f}s 後重試...")
+        time.sleep(backoff)
+
+    if breaker and domain:
+        if failure is None:
+            breaker.record_success(domain)
+        elif failure == FAILURE_TIMEOUT and clamped:
+            print("⏱️ 逾時受執行期限縮短，不計入斷路器")
+        elif failure != FAILURE_OTHER:
+            breaker.record_failure(domain)
+
+    return {
+        "ok": failure is None,
+        "failure": failure,
+        "status": status,
+        "document": document,
+        "attempts": attempts,
+        "error": attempts[-1]["error"],
+        "timeout_clamped": failure == FAILURE_TIMEOUT and clamped,
+    }
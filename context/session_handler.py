@@ -0,0 +1,211 @@
+"""
+瀏覽器工作階段模組
+Browser Session Module
+此模組在請求結束時保存 cookies、localStorage 與 sessionStorage（加密後存入儲存後端），並在下一次導航前還原
+"""
+
+import base64
+import hashlib
+import json
+import os
+import time
+from storage_handler import create_store
+
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+except ImportError:
+    Fernet = None
+    InvalidToken = None
+
+DEFAULT_SESSION_TTL = 3600
+
+# 讀取目前頁面來源的 localStorage 與 sessionStorage
+READ_STORAGE_SCRIPT = """
+const dump = (storage) => {
+    const items = {};
+    for (let i = 0; i < storage.length; i++) {
+        const key = storage.key(i);
+        items[key] = storage.getItem(key);
+    }
+    return items;
+};
+try {
+    return {origin: location.origin, local: dump(localStorage), session: dump(sessionStorage)};
+} catch (e) {
+    return {origin: location.origin, local: {}, session: {}};
+}
+"""
+
+# 新文件建立時還原同來源的儲存內容（只補上頁面尚未設定的鍵）
+RESTORE_STORAGE_TEMPLATE = """
+(() => {
+    const entry = (%s)[location.origin];
+    if (!entry) return;
+    const restore = (storage, items) => {
+        for (const [key, value] of Object.entries(items || {})) {
+            if (storage.getItem(key) === null) storage.setItem(key, value);
+        }
+    };
+    try {
+        restore(localStorage, entry.local);
+        restore(sessionStorage, entry.session);
+    } catch (e) {}
+})();
+"""
+
+# Selenium cookie 欄位與 DevTools CookieParam 欄位的對應
+COOKIE_FIELDS = {
+    "name": "name",
+    "value": "value",
+    "domain": "domain",
+    "path": "path",
+    "secure": "secure",
+    "httpOnly": "httpOnly",
+    "sameSite": "sameSite",
+    "expiry": "expires",
+    "expires": "expires",
+}
+
+
+class SessionError(Exception):
+    """工作階段無法保存或還原"""
+
+
+def to_cookie_params(cookies, url):
+    """將 Selenium 格式的 cookies 轉換為 Network.setCookies 參數（未指定網域時套用目標網址）"""
+    params = []
+    for cookie in cookies or []:
+        param = {
+            target: cookie[source]
+            for source, target in COOKIE_FIELDS.items()
+            if cookie.get(source) is not None
+        }
+        if param.get("expires") is not None and (
+            param["expires"] < 0 or cookie.get("session")
+        ):
+            # 工作階段 cookie 不帶到期時間
+            del param["expires"]
+        if "domain" not in param:
+            param["url"] = url
+        params.append(param)
+    return params
+
+
+def set_cookies(driver, cookies, url):
+    """以 DevTools 直接寫入 cookies，不需要先導航到目標網域"""
+    params = to_cookie_params(cookies, url)
+    if params:
+        driver.execute_cdp_cmd("Network.setCookies", {"cookies": params})
+    return len(params)
+
+
+class SessionCipher:
+    """工作階段加密（Fernet：AES-128-CBC + HMAC-SHA256）"""
+
+    def __init__(self, secret=None):
+        """初始化加密器，secret 預設取自 SESSION_SECRET 環境變數"""
+        secret = secret or os.environ.get("SESSION_SECRET")
+        if Fernet is None:
+            raise SessionError("缺少 cryptography 套件，無法加密工作階段")
+        if not secret:
+            raise SessionError("未設定 SESSION_SECRET，無法加密工作階段")
+        # 任意長度的密語轉換為 Fernet 需要的 32 位元組金鑰
+        key = base64.urlsafe_b64encode(hashlib.sha256(secret.encode("utf-8")).digest())
+        self.fernet = Fernet(key)
+
+    def encrypt(self, value):
+        """加密 JSON 資料"""
+        return self.fernet.encrypt(
+            json.dumps(value, ensure_ascii=False).encode("utf-8")
+        ).decode("ascii")
+
+    def decrypt(self, token):
+        """解密 JSON 資料，金鑰不符或資料遭竄改時回傳 None"""
+        try:
+            return json.loads(self.fernet.decrypt(token.encode("ascii")))
+        except InvalidToken:
+            return None
+
+
+class SessionManager:
+    """瀏覽器工作階段管理器"""
+
+    def __init__(self, driver, store=None, cipher=None):
+        """初始化工作階段管理器"""
+        self.driver = driver
+        self.store = store or create_store("sessions")
+        self.cipher = cipher or SessionCipher()
+        self.storage_script_id = None
+
+    def load(self, session_id):
+        """讀取並解密工作階段，不存在、過期或無法解密時回傳 None"""
+        record = self.store.get(session_id)
+        if not record:
+            return None
+        session = self.cipher.decrypt(record["data"])
+        if session is None:
+            print(f"⚠️ 工作階段 {session_id} 無法解密，忽略")
+        return session
+
+    def restore(self, session_id, url):
+        """在導航前還原 cookies 並註冊儲存內容的還原腳本"""
+        session = self.load(session_id)
+        if not session:
+            print(f"🆕 工作階段 {session_id} 不存在，將於請求結束後建立")
+            return {"id": session_id, "restored": False}
+
+        cookie_count = set_cookies(self.driver, session.get("cookies"), url)
+        origins = session.get("origins") or {}
+        if origins:
+            result = self.driver.execute_cdp_cmd(
+                "Page.addScriptToEvaluateOnNewDocument",
+                {"source": RESTORE_STORAGE_TEMPLATE % json.dumps(origins)},
+            )
+            self.storage_script_id = result.get("identifier")
+
+        print(f"🔑 已還原工作階段 {session_id} (cookies: {cookie_count}, 來源: {len(origins)})")
+        return {
+            "id": session_id,
+            "restored": True,
+            "cookies": cookie_count,
+            "origins": len(origins),
+            "saved_at": session.get("saved_at"),
+        }
+
+    def save(self, session_id, ttl=DEFAULT_SESSION_TTL):
+        """保存所有 cookies 與目前頁面來源的儲存內容（保留其他來源先前保存的內容）"""
+        self.clear_restore_script()
+        previous = self.load(session_id) or {}
+        cookies = self.driver.execute_cdp_cmd("Network.getAllCookies", {}).get(
+            "cookies", []
+        )
+        origins = dict(previous.get("origins") or {})
+        storage = self.driver.execute_script(READ_STORAGE_SCRIPT) or {}
+        if storage.get("origin") and storage["origin"] != "null":
+            origins[storage["origin"]] = {
+                "local": storage.get("local") or {},
+                "session": storage.get("session") or {},
+            }
+
+        session = {"cookies": cookies, "origins": origins, "saved_at": int(time.time())}
+        self.store.put(session_id, {"data": self.cipher.encrypt(session)}, ttl=ttl)
+        print(f"💾 已保存工作階段 {session_id} (cookies: {len(cookies)}, 來源: {len(origins)})")
+        return {
+            "saved": True,
+            "cookies": len(cookies),
+            "origins": len(origins),
+            "expires_at": session["saved_at"] + ttl,
+        }
+
+    def clear_restore_script(self):
+        """移除還原腳本，避免影響重複使用的瀏覽器"""
+        if self.storage_script_id is None:
+            return
+        try:
+            self.driver.execute_cdp_cmd(
+                "Page.removeScriptToEvaluateOnNewDocument",
+                {"identifier": self.storage_script_id},
+            )
+        except Exception as e:
+            print(f"⚠️ 無法移除工作階段還原腳本: {e}")
+        self.storage_script_id = None
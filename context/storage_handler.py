@@ -0,0 +1,252 @@
+"""
+儲存後端模組
+Storage Backend Module
+此模組提供可插拔的鍵值儲存，用於保存跨次呼叫的狀態
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from abc import ABC, abstractmethod
+
+DEFAULT_STORE_ROOT = "/tmp/selenium-store"
+
+
+class BaseStore(ABC):
+    """鍵值儲存基底類別"""
+
+    @abstractmethod
+    def get(self, key):
+        """讀取資料，不存在或已過期時回傳 None"""
+
+    @abstractmethod
+    def put(self, key, value, ttl=None):
+        """寫入資料，ttl 為秒數"""
+
+    @abstractmethod
+    def delete(self, key):
+        """刪除資料"""
+
+    @staticmethod
+    def _wrap(value, ttl=None):
+        """包裝資料與過期時間"""
+        return {
+            "value": value,
+            "expires_at": time.time() + ttl if ttl else None,
+        }
+
+    @staticmethod
+    def _unwrap(record):
+        """解開資料，過期則回傳 None"""
+        if not record:
+            return None
+        expires_at = record.get("expires_at")
+        if expires_at and expires_at < time.time():
+            return None
+        return record.get("value")
+
+
+class MemoryStore(BaseStore):
+    """記憶體儲存，僅在同一個 Lambda 容器內有效"""
+
+    _data = {}
+
+    def __init__(self, namespace="default"):
+        """初始化記憶體儲存"""
+        self.bucket = MemoryStore._data.setdefault(namespace, {})
+
+    def get(self, key):
+        """讀取資料"""
+        return self._unwrap(self.bucket.get(key))
+
+    def put(self, key, value, ttl=None):
+        """寫入資料"""
+        self.bucket[key] = self._wrap(value, ttl)
+
+    def delete(self, key):
+        """刪除資料"""
+        self.bucket.pop(key, None)
+
+
+class LocalFileStore(BaseStore):
+    """本機檔案儲存（預設位於 /tmp）"""
+
+    def __init__(self, namespace="default", root=None):
+        """初始化本機檔案儲存"""
+        self.directory = os.path.join(root or DEFAULT_STORE_ROOT, namespace)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key):
+        """將鍵轉換為檔案路徑"""
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def get(self, key):
+        """讀取資料"""
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                return self._unwrap(json.load(f))
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, value, ttl=None):
+        """寫入資料（先寫暫存檔再替換，避免讀到半份檔案）"""
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._wrap(value, ttl), f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def delete(self, key):
+        """刪除資料"""
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+
+class S3Store(BaseStore):
+    """S3 儲存，供多個 Lambda 容器共享狀態"""
+
+    def __init__(self, namespace="default", bucket=None, prefix=None):
+        """初始化 S3 儲存"""
+        import boto3
+
+        self.client = boto3.client("s3")
+        self.bucket = bucket or os.environ["STORE_BUCKET"]
+        self.prefix = (
+            f"{prefix or os.environ.get('STORE_PREFIX', 'selenium-store')}/{namespace}"
+        )
+
+    def _object_key(self, key):
+        """將鍵轉換為 S3 物件路徑"""
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return f"{self.prefix}/{digest}.json"
+
+    def get(self, key):
+        """讀取資料"""
+        try:
+            obj = self.client.get_object(Bucket=self.bucket, Key=self._object_key(key))
+            return self._unwrap(json.loads(obj["Body"].read()))
+        except self.client.exceptions.NoSuchKey:
+            return None
+
+    def put(self, key, value, ttl=None):
+        """寫入資料"""
+        self.client.put_object(
+            Bucket=self.bucket,
+            Key=self._object_key(key),
+            Body=json.dumps(self._wrap(value, ttl), ensure_ascii=False).encode("utf-8"),
+            ContentType="application/json",
+        )
+
+    def delete(self, key):
+        """刪除資料"""
+        self.client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+
+
+def create_store(namespace, backend=None):
+    """
+    依環境變數建立儲存後端
+    STORE_BACKEND: local（預設）、memory、s3
+    """
+    backend = (backend or os.environ.get("STORE_BACKEND", "local")).lower()
+
+    if backend == "memory":
+        return MemoryStore(namespace)
+    if backend == "s3":
+        try:
+            return S3Store(namespace)
+        except Exception as e:
+            print(f"⚠️ S3 儲存初始化失敗，改用本機檔案: {e}")
+    return LocalFileStore(namespace, root=os.environ.get("STORE_ROOT"))
+
+
+DEFAULT_ARTIFACT_ROOT = "/tmp/selenium-artifacts"
+
+# 回應中直接內嵌的內容上限，超過時改寫入成品輸出（Lambda 回應上限為 6 MB）
+INLINE_LIMIT = 4 * 1024 * 1024
+
+
+class BaseArtifactSink(ABC):
+    """成品輸出基底類別"""
+
+    @abstractmethod
+    def save_file(self, path, name, content_type=None):
+        """保存暫存檔（保存後暫存檔不再存在），回傳成品參照"""
+
+    def save_bytes(self, data, name, content_type=None):
+        """將記憶體中的小型資料寫入暫存檔後保存"""
+        fd, temp_path = tempfile.mkstemp()
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        return self.save_file(temp_path, name, content_type)
+
+
+class LocalArtifactSink(BaseArtifactSink):
+    """本機檔案成品輸出（預設位於 /tmp）"""
+
+    def __init__(self, root=None):
+        """初始化本機成品輸出"""
+        self.root = root or DEFAULT_ARTIFACT_ROOT
+
+    def save_file(self, path, name, content_type=None):
+        """將暫存檔移動到成品目錄，回傳成品參照"""
+        destination = os.path.join(self.root, name)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        os.replace(path, destination)
+        return {
+            "uri": f"file://{destination}",
+            "size": os.path.getsize(destination),
+            "content_type": content_type,
+        }
+
+
+class S3ArtifactSink(BaseArtifactSink):
+    """S3 成品輸出，直接由檔案串流上傳"""
+
+    def __init__(self, bucket=None, prefix=None, url_expires=3600):
+        """初始化 S3 成品輸出"""
+        import boto3
+
+        self.client = boto3.client("s3")
+        self.bucket = bucket or os.environ["ARTIFACT_BUCKET"]
+        self.prefix = prefix or os.environ.get("ARTIFACT_PREFIX", "selenium-artifacts")
+        self.url_expires = url_expires
+
+    def save_file(self, path, name, content_type=None):
+        """上傳暫存檔後刪除，回傳成品參照與預簽網址"""
+        key = f"{self.prefix}/{name}"
+        size = os.path.getsize(path)
+        extra_args = {"ContentType": content_type} if content_type else None
+        try:
+            self.client.upload_file(path, self.bucket, key, ExtraArgs=extra_args)
+        finally:
+            os.remove(path)
+        return {
+            "uri": f"s3://{self.bucket}/{key}",
+            "url": self.client.generate_presigned_url(
+                "get_object",
+                Params={"Bucket": self.bucket, "Key": key},
+                ExpiresIn=self.url_expires,
+            ),
+            "size": size,
+            "content_type": content_type,
+        }
+
+
+def create_artifact_sink(backend=None):
+    """
+    依環境變數建立成品輸出
+    ARTIFACT_BACKEND: local（預設）、s3
+    """
+    backend = (backend or os.environ.get("ARTIFACT_BACKEND", "local")).lower()
+
+    if backend == "s3":
+        try:
+            return S3ArtifactSink()
+        except Exception as e:
+            print(f"⚠️ S3 成品輸出初始化失敗，改用本機檔案: {e}")
+    return LocalArtifactSink(root=os.environ.get("ARTIFACT_ROOT"))
@@ -0,0 +1,311 @@
+"""
+分散式追蹤模組
+Distributed Tracing Module
+此模組以 W3C traceparent 延續上游追蹤，為各處理階段建立 OpenTelemetry 格式的 span，並以 OTLP/HTTP 匯出
+"""
+
+import contextvars
+import functools
+import json
+import os
+import random
+import time
+from urllib.request import Request, urlopen
+
+# 以 OTEL_* 環境變數設定（與 OpenTelemetry SDK 相同）
+SERVICE_NAME = os.environ.get("OTEL_SERVICE_NAME", "lambda-container-selenium")
+EXPORT_TIMEOUT = float(os.environ.get("OTEL_EXPORTER_OTLP_TIMEOUT", "2000")) / 1000
+
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+
+def _otlp_endpoint():
+    """OTLP/HTTP 追蹤端點，未設定時回傳 None（停用追蹤）"""
+    endpoint = os.environ.get("OTEL_EXPORTER_OTLP_TRACES_ENDPOINT")
+    if endpoint:
+        return endpoint
+    base = os.environ.get("OTEL_EXPORTER_OTLP_ENDPOINT")
+    return f"{base.rstrip('/')}/v1/traces" if base else None
+
+
+def _otlp_headers():
+    """解析 OTEL_EXPORTER_OTLP_HEADERS（key=value,key=value）"""
+    headers = {"Content-Type": "application/json"}
+    for item in os.environ.get("OTEL_EXPORTER_OTLP_HEADERS", "").split(","):
+        if "=" in item:
+            key, value = item.split("=", 1)
+            headers[key.strip()] = value.strip()
+    return headers
+
+
+def _sample_ratio():
+    """無上游決定時的取樣比例（OTEL_TRACES_SAMPLER_ARG，預設全部取樣）"""
+    try:
+        return min(1.0, max(0.0, float(os.environ.get("OTEL_TRACES_SAMPLER_ARG", "1"))))
+    except ValueError:
+        return 1.0
+
+
+def parse_traceparent(value):
+    """解析 W3C traceparent，格式錯誤時回傳 None"""
+    parts = (value or "").strip().lower().split("-")
+    if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        flags = int(parts[3][:2], 16)
+        int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None
+    if parts[1] == "0" * 32 or parts[2] == "0" * 16:
+        return None
+    return {"trace_id": parts[1], "span_id": parts[2], "sampled": bool(flags & 1)}
+
+
+def extract_trace_context(event, payload):
+    """由 API Gateway 標頭或事件內容取得上游追蹤內容"""
+    headers = {
+        str(key).lower(): value
+        for key, value in ((event or {}).get("headers") or {}).items()
+    }
+    parent = parse_traceparent(headers.get("traceparent"))
+    if parent is None:
+        parent = parse_traceparent((payload or {}).get("traceparent"))
+    return parent
+
+
+class Span:
+    """追蹤區段"""
+
+    def __init__(
+        self, tracer, name, parent_id, kind=SPAN_KIND_INTERNAL, attributes=None
+    ):
+        """初始化追蹤區段"""
+        self.tracer = tracer
+        self.name = name
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        self.status = None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.token = None
+
+    def set_attribute(self, key, value):
+        """設定屬性"""
+        self.attributes[key] = value
+
+    def record_exception(self, error):
+        """記錄例外並標記為錯誤"""
+        self.status = (STATUS_ERROR, f"{type(error).__name__}: {error}"[:500])
+
+    def end(self):
+        """結束區段"""
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            self.tracer.finished.append(self)
+
+    def __enter__(self):
+        """進入區段，成為目前的父區段"""
+        self.token = self.tracer.current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        """離開區段，有例外時標記為錯誤"""
+        if exc is not None:
+            self.record_exception(exc)
+        self.tracer.current.reset(self.token)
+        self.end()
+        return False
+
+    def to_otlp(self, trace_id):
+        """轉換為 OTLP/JSON span"""
+        span = {
+            "traceId": trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or time.time_ns()),
+            "attributes": [_otlp_attribute(k, v) for k, v in self.attributes.items()],
+            "status": (
+                {"code": self.status[0], "message": self.status[1]}
+                if self.status
+                else {"code": STATUS_OK}
+            ),
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class _NoopSpan:
+    """未取樣時使用的空區段，所有操作都不做事"""
+
+    span_id = None
+
+    def set_attribute(self, key, value):
+        """不記錄屬性"""
+
+    def record_exception(self, error):
+        """不記錄例外"""
+
+    def end(self):
+        """不需結束"""
+
+    def __enter__(self):
+        """進入空區段"""
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        """離開空區段"""
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def _otlp_attribute(key, value):
+    """轉換為 OTLP/JSON 屬性"""
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+class Tracer:
+    """單次呼叫的追蹤器：根區段延續上游追蹤，子區段依呼叫巢狀建立"""
+
+    def __init__(self, parent=None, endpoint=None, ratio=1.0):
+        """初始化追蹤器並決定是否取樣"""
+        self.endpoint = endpoint
+        self.parent = parent
+        self.trace_id = (
+            parent["trace_id"] if parent else f"{random.getrandbits(128):032x}"
+        )
+        if not endpoint:
+            self.sampled = False
+        elif parent is not None:
+            # 依上游決定取樣（parent-based）
+            self.sampled = parent["sampled"]
+        else:
+            # trace-id ratio：以 trace id 後 64 位元決定，同一追蹤的決定一致
+            self.sampled = int(self.trace_id[16:], 16) < ratio * (1 << 64)
+        self.current = contextvars.ContextVar("span", default=None)
+        self.finished = []
+        self.root = None
+
+    def span(self, name, kind=SPAN_KIND_INTERNAL, **attributes):
+        """建立目前區段的子區段（未取樣時回傳空區段）"""
+        if not self.sampled:
+            return NOOP_SPAN
+        current = self.current.get()
+        if current is not None:
+            parent_id = current.span_id
+        else:
+            parent_id = self.parent["span_id"] if self.parent else None
+        return Span(self, name, parent_id, kind, attributes)
+
+    def start_root(self, name, **attributes):
+        """建立並進入根區段"""
+        self.root = self.span(name, kind=SPAN_KIND_SERVER, **attributes)
+        return self.root.__enter__()
+
+    def flush(self):
+        """結束根區段並匯出所有區段（Lambda 回傳後會凍結，因此同步匯出）"""
+        if self.root is not None and self.root is not NOOP_SPAN:
+            self.root.__exit__(None, None, None)
+            self.root = None
+        if not self.sampled or not self.finished:
+            return
+        body = {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            _otlp_attribute("service.name", SERVICE_NAME),
+                            _otlp_attribute("cloud.provider", "aws"),
+                            _otlp_attribute(
+                                "faas.name",
+                                os.environ.get("AWS_LAMBDA_FUNCTION_NAME", "local"),
+                            ),
+                        ]
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": "selenium-scraper"},
+                            "spans": [s.to_otlp(self.trace_id) for s in self.finished],
+                        }
+                    ],
+                }
+            ]
+        }
+        spans = len(self.finished)
+        self.finished = []
+        try:
+            request = Request(
+                self.endpoint,
+                data=json.dumps(body).encode("utf-8"),
+                headers=_otlp_headers(),
+                method="POST",
+            )
+            with urlopen(request, timeout=EXPORT_TIMEOUT) as f:
+                f.read()
+            print(f"🛰️ 已匯出 {spans} 個追蹤區段 (trace: {self.trace_id})")
+        except Exception as e:
+            print(f"⚠️ 追蹤匯出失敗: {e}")
+
+
+# 目前呼叫的追蹤器（預設為不取樣的追蹤器，未設定端點時完全不做事）
+_tracer = contextvars.ContextVar("tracer", default=Tracer())
+
+
+def reset_trace():
+    """清除上一次呼叫的追蹤器（暖容器中 ContextVar 會保留到下一次呼叫）"""
+    _tracer.set(Tracer())
+
+
+def start_trace(event=None, payload=None):
+    """依上游追蹤內容與 OTEL_* 設定建立這次呼叫的追蹤器"""
+    tracer = Tracer(
+        extract_trace_context(event, payload),
+        endpoint=_otlp_endpoint(),
+        ratio=_sample_ratio(),
+    )
+    _tracer.set(tracer)
+    return tracer
+
+
+def get_tracer():
+    """取得目前呼叫的追蹤器"""
+    return _tracer.get()
+
+
+def span(name, **attributes):
+    """在目前追蹤器下建立區段"""
+    return _tracer.get().span(name, **attributes)
+
+
+def traced(name):
+    """以區段包住函式呼叫的裝飾器；未取樣時直接呼叫"""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            tracer = _tracer.get()
+            if not tracer.sampled:
+                return func(*args, **kwargs)
+            with tracer.span(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
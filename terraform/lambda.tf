@@ -20,8 +20,26 @@ locals {
   timestamp = formatdate("YYMMDD-hhmmss", timeadd(timestamp(), "8h"))
   source_hash = md5(join("", [
     filemd5("../context/main.py"),
+    filemd5("../context/actions_handler.py"),
+    filemd5("../context/browser_handler.py"),
+    filemd5("../context/crawl_handler.py"),
     filemd5("../context/font_handler.py"),
     filemd5("../context/loading_handler.py"),
+    filemd5("../context/deadline_handler.py"),
+    filemd5("../context/document_handler.py"),
+    filemd5("../context/dom_handler.py"),
+    filemd5("../context/emulation_handler.py"),
+    filemd5("../context/extraction_handler.py"),
+    filemd5("../context/image_handler.py"),
+    filemd5("../context/isolation_handler.py"),
+    filemd5("../context/monitor_handler.py"),
+    filemd5("../context/network_handler.py"),
+    filemd5("../context/pdf_handler.py"),
+    filemd5("../context/profiling_handler.py"),
+    filemd5("../context/retry_handler.py"),
+    filemd5("../context/session_handler.py"),
+    filemd5("../context/storage_handler.py"),
+    filemd5("../context/tracing_handler.py"),
     filemd5("../context/Dockerfile")
   ]))
 }